@@ -0,0 +1,203 @@
+# Precomputed aggregate cube over the hourly series.
+#
+# cube[year_slot, month, day, attribute, statistic]
+#   year_slot 0 = all years, 1.. = first_year..last_year
+#   month 0     = whole year (or whole history), 1..12
+#   day 0       = whole month, 1..31
+#   attribute   = weather_store.ATTRIBUTES order
+#   statistic   = mean, median, mode, min, max
+# Missing periods are NaN. The cube is saved to data/aggregates.npz.
+
+import os
+import threading
+
+import numpy as np
+
+import data_version
+import weather_store
+
+STATISTICS = ["mean", "median", "mode", "min", "max"]
+INDEX_FILE = "aggregates.npz"
+
+
+def group_statistics(keys, values):
+    """
+    mean / median / mode / min / max of values per integer key, ignoring NaN.
+    Mode is the smallest of the most frequent values, as in pandas.
+
+    Returns:
+        (unique keys, array of shape (len(unique keys), 5))
+    """
+    ok = ~np.isnan(values)
+    keys, values = keys[ok], values[ok]
+    if keys.size == 0:
+        return keys, np.empty((0, len(STATISTICS)))
+
+    order = np.lexsort((values, keys))
+    k, v = keys[order], values[order]
+    groups, start, counts = np.unique(k, return_index=True, return_counts=True)
+    end = start + counts
+
+    mean = np.add.reduceat(v, start) / counts
+    median = (v[start + (counts - 1) // 2] + v[start + counts // 2]) / 2
+
+    # Mode: longest run of equal values inside each group, first (smallest) on ties
+    run_start = np.flatnonzero(np.r_[True, (k[1:] != k[:-1]) | (v[1:] != v[:-1])])
+    run_len = np.diff(np.r_[run_start, v.size])
+    run_group = np.searchsorted(start, run_start, side="right") - 1
+    best = np.lexsort((run_start, -run_len, run_group))
+    best = best[np.r_[True, run_group[best][1:] != run_group[best][:-1]]]
+    mode = v[run_start[best]]
+
+    return groups, np.stack([mean, median, mode, v[start], v[end - 1]], axis=1)
+
+
+def build_cube(series):
+    times = np.asarray(series["time"], dtype=np.int64).astype("datetime64[s]")
+    months = times.astype("datetime64[M]")
+    years = months.astype("datetime64[Y]").astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (times.astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64) + 1
+
+    first_year = int(years.min()) if years.size else 0
+    n_years = int(years.max()) - first_year + 1 if years.size else 0
+    shape = (n_years + 1, 13, 32, len(weather_store.ATTRIBUTES), len(STATISTICS))
+    cube = np.full(shape, np.nan)
+    flat = cube.reshape(-1, len(weather_store.ATTRIBUTES), len(STATISTICS))
+
+    year_slot = years - first_year + 1
+    zeros = np.zeros_like(year_slot)
+    levels = [
+        (year_slot, month, day),   # day
+        (year_slot, month, zeros),  # month
+        (year_slot, zeros, zeros),  # year
+        (zeros, month, day),       # calendar day across all years
+        (zeros, month, zeros),     # calendar month across all years
+        (zeros, zeros, zeros),     # whole history
+    ]
+    for a, attribute in enumerate(weather_store.ATTRIBUTES):
+        values = np.asarray(series[attribute], dtype=np.float64).round(2)
+        for y, m, d in levels:
+            keys = (y * 13 + m) * 32 + d
+            groups, stats = group_statistics(keys, values)
+            flat[groups, a] = stats
+    return first_year, cube
+
+
+class AggregateIndex:
+    def __init__(self, first_year, cube):
+        self.first_year = int(first_year)
+        self.cube = cube
+        self.years = np.arange(self.first_year, self.first_year + cube.shape[0] - 1)
+
+    @classmethod
+    def build(cls, data_dir=weather_store.DATA_DIR):
+        first_year, cube = build_cube(weather_store.load_series(data_dir=data_dir))
+        return cls(first_year, cube)
+
+    def save(self, path):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, first_year=self.first_year, cube=self.cube)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(int(data["first_year"]), data["cube"])
+
+    def _axes(self, attribute, statistic):
+        try:
+            return weather_store.ATTRIBUTES.index(attribute), STATISTICS.index(statistic)
+        except ValueError:
+            raise ValueError(f"Unknown attribute/statistic '{attribute}'/'{statistic}'.")
+
+    def lookup(self, attribute, statistic, year=None, month=None, day=None):
+        """
+        Single aggregate value, or None when the period has no data.
+        Omitted year means across all years; day requires month. Months outside
+        1-12 and days outside 1-31 have no data either.
+        """
+        a, s = self._axes(attribute, statistic)
+        slot = year - self.first_year + 1 if year else 0
+        if not (1 if year else 0) <= slot < self.cube.shape[0] or (day and not month):
+            return None
+        if (month and not 1 <= month <= 12) or (day and not 1 <= day <= 31):
+            return None
+        value = self.cube[slot, month or 0, day or 0, a, s]
+        return None if np.isnan(value) else float(value)
+
+    def trend(self, attribute, statistic, month=None, year_range=None):
+        """
+        {year: value} for every year (one strided slice of the cube), empty
+        for a month outside 1-12.
+        """
+        a, s = self._axes(attribute, statistic)
+        if month and not 1 <= month <= 12:
+            return {}
+        values = self.cube[1:, month or 0, 0, a, s]
+        keep = ~np.isnan(values)
+        if year_range:
+            keep &= (self.years >= year_range[0]) & (self.years <= year_range[1])
+        return {int(y): round(float(v), 2) for y, v in zip(self.years[keep], values[keep])}
+
+
+def index_path(data_dir=weather_store.DATA_DIR):
+    return os.path.join(data_dir, INDEX_FILE)
+
+
+def _is_stale(path, data_dir):
+    if not os.path.exists(path):
+        return True
+    built = os.path.getmtime(path)
+    return any(
+        os.path.getmtime(weather_store.json_path(year, data_dir)) > built
+        for year in weather_store.available_years(data_dir)
+    )
+
+
+def load_or_build(data_dir=weather_store.DATA_DIR):
+    """
+    Load the persisted index, rebuilding it when any JSON file is newer.
+    Returns None if there is no weather data at all.
+    """
+    if not weather_store.available_years(data_dir):
+        return None
+    path = index_path(data_dir)
+    if _is_stale(path, data_dir):
+        index = AggregateIndex.build(data_dir)
+        index.save(path)
+        return index
+    return AggregateIndex.load(path)
+
+
+_index = None
+_index_lock = threading.Lock()
+_index_version = data_version.VersionCheck()
+
+
+def get_index():
+    """
+    Process-wide AggregateIndex, loaded on first use (None without data) and
+    reloaded when data_version changes.
+    """
+    global _index
+    if _index is not None and _index_version.stale():
+        reset_index()
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index_version.mark()
+                _index = load_or_build()
+    return _index
+
+
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+if __name__ == "__main__":
+    index = AggregateIndex.build()
+    index.save(index_path())
+    print(f"✅ Aggregate index for {index.years[0]}–{index.years[-1]} saved to {index_path()}.")
@@ -0,0 +1,135 @@
+# Multi-tier answer cache for ask_ai.
+#
+#   normalised question -> generated code
+#   generated code      -> executed variables (JSON)
+#   variables           -> final summary text
+#
+# Every entry carries the data version it was computed under; entries from
+# another version are never returned and are purged when the version changes.
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+
+import data_version
+
+CACHE_PATH = os.path.join("cache", "answers.sqlite")
+TIERS = ("code", "result", "summary")
+
+
+def normalise_question(question):
+    question = question.lower().strip()
+    question = re.sub(r"[?!.]+$", "", question)
+    return re.sub(r"\s+", " ", question).strip()
+
+
+def _key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _json_default(value):
+    # numpy scalars and arrays, sets; anything else (timestamps, documents' objects) as text
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def plain(variables):
+    """
+    Variables converted to plain JSON types (dict with str keys, list, str,
+    int, float, bool, None), exactly as the result tier stores them, so a
+    fresh execution and a cache hit hand the same data to the summary.
+    """
+    return json.loads(json.dumps(variables, default=_json_default))
+
+
+def variables_key(variables):
+    return _key(json.dumps(variables, sort_keys=True, default=str))
+
+
+class AnswerCache:
+    def __init__(self, path=CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._version = None
+        self.stats = {f"{tier}_{outcome}": 0 for tier in TIERS for outcome in ("hits", "misses")}
+        with self._lock:
+            for tier in TIERS:
+                self._db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {tier} (version TEXT, key TEXT, value TEXT, PRIMARY KEY (version, key))"
+                )
+            self._db.commit()
+
+    def version(self):
+        """
+        Current data version; purges entries of older versions when it changes.
+        """
+        version = data_version.current_version()
+        if version != self._version:
+            with self._lock:
+                for tier in TIERS:
+                    self._db.execute(f"DELETE FROM {tier} WHERE version != ?", (version,))
+                self._db.commit()
+                self._version = version
+        return version
+
+    def _get(self, tier, key):
+        version = self.version()
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT value FROM {tier} WHERE version = ? AND key = ?", (version, key)
+            ).fetchone()
+            self.stats[f"{tier}_{'hits' if row else 'misses'}"] += 1
+        return row[0] if row else None
+
+    def _put(self, tier, key, value):
+        version = self.version()
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {tier} (version, key, value) VALUES (?, ?, ?)", (version, key, value)
+            )
+            self._db.commit()
+
+    def get_code(self, question):
+        return self._get("code", _key(normalise_question(question)))
+
+    def put_code(self, question, code):
+        self._put("code", _key(normalise_question(question)), code)
+
+    def get_result(self, code):
+        value = self._get("result", _key(code))
+        return json.loads(value) if value is not None else None
+
+    def put_result(self, code, variables):
+        self._put("result", _key(code), json.dumps(plain(variables)))
+
+    def get_summary(self, variables):
+        return self._get("summary", variables_key(variables))
+
+    def put_summary(self, variables, summary):
+        self._put("summary", variables_key(variables), summary)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
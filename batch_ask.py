@@ -0,0 +1,235 @@
+# Batch question mode for nightly reports.
+#
+#   python batch_ask.py questions.txt -o answers.jsonl --concurrency 8 --per-minute 60
+#
+# Input is one question per line, or JSON lines {"id": ..., "question": ...}.
+# Repeated questions (after normalisation) are answered once. Code generation
+# runs concurrently under a rate limiter, then every generated plan executes
+# against one shared call registry, so an analysis call that several questions
+# need runs once for the whole batch. Answers are written as JSON lines in
+# input order, tagged with each request's id.
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import answer_cache
+import ask_ai
+import intent_parser
+import plan_executor
+import prompt_builder
+import semantic_cache
+
+
+class RateLimiter:
+    """
+    Token bucket allowing per_minute acquisitions per minute on average and
+    bursts of up to burst at once.
+    """
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or max(1, per_minute // 10))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def read_questions(lines):
+    """
+    Parse input lines into [{"id", "question"}]; plain lines get their line number as id.
+    """
+    requests = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            request = {"id": number, "question": line}
+        request.setdefault("id", number)
+        requests.append(request)
+    return requests
+
+
+def dedupe(requests):
+    """
+    Group requests by normalised question, keeping first-seen order.
+    """
+    groups = OrderedDict()
+    for request in requests:
+        groups.setdefault(answer_cache.normalise_question(request["question"]), []).append(request)
+    return groups
+
+
+def run_batch(requests, model=None, concurrency=8, per_minute=60, cache=None, semantic=None, fast_path=True):
+    """
+    Answer a batch of questions.
+
+    Parameters:
+        requests: [{"id", "question"}], e.g. from read_questions.
+        concurrency: questions generated, executed and summarised at once.
+        per_minute: LLM requests allowed per minute (code and summaries).
+
+    Returns:
+        (answers in request order, stats dict)
+    """
+    if model is None:
+        ask_ai.configure_gemini()
+    groups = dedupe(requests)
+    limiter = RateLimiter(per_minute)
+    registry = plan_executor.CallRegistry()
+    stats = {"questions": len(requests), "unique": len(groups), "llm_requests": 0}
+    stats_lock = threading.Lock()
+
+    def session_model():
+        # Built per question (model=None): a long batch can outlive the cached context
+        if model is not None:
+            return model
+        prompt_builder.keep_alive()
+        return ask_ai.build_model()
+
+    def llm(convo, message):
+        limiter.acquire()
+        with stats_lock:
+            stats["llm_requests"] += 1
+        return convo.send_message(message).text
+
+    def guarded(stage):
+        # One failing question (Gemini error, bad plan) is recorded on its own
+        # job instead of raising out of pool.map and losing the whole batch
+        def run(job):
+            if "error" in job:
+                return job
+            try:
+                return stage(job)
+            except Exception as e:
+                job["error"] = f"{type(e).__name__}: {e}"
+                return job
+        return run
+
+    @guarded
+    def generate(job):
+        reply, cached, intent = ask_ai.lookup_code(job["question"], cache, semantic, fast_path)
+        job.update(cached=cached, intent=intent)
+        if reply is None:
+            job["convo"] = session_model().start_chat(history=[])
+            reply = ask_ai.clean_code_block(llm(job["convo"], job["question"]).strip())
+        job["code"] = reply
+        return job
+
+    @guarded
+    def execute(job):
+        variables = cache.get_result(job["code"]) if cache else None
+        if variables is not None:
+            job["cached"]["result"] = True
+        else:
+            variables = answer_cache.plain(ask_ai.run_generated_code(job["code"], registry=registry))
+            if cache:
+                cache.put_result(job["code"], variables)
+        ask_ai.remember_code(job["question"], job["code"], job["cached"], cache, semantic)
+        job["variables"] = variables
+        return job
+
+    @guarded
+    def summarize(job):
+        variables = job["variables"]
+        job["nth_summary"] = ask_ai.nth_value_summary(job["code"], variables)
+        if job["intent"] is not None:
+            job["summary"] = intent_parser.describe_result(job["intent"], variables.get("result"))
+            return job
+        summary = cache.get_summary(variables) if cache else None
+        if summary is not None:
+            job["cached"]["summary"] = True
+        else:
+            convo = job["convo"] or ask_ai.replay_chat(session_model(), job["question"], job["code"])
+            summary = llm(convo, ask_ai.summary_prompt(variables))
+            if cache:
+                cache.put_summary(variables, summary)
+        job["summary"] = summary
+        return job
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Stage by stage, so every plan is known before execution and the
+        # registry can coalesce calls across all of them
+        jobs = [
+            {"question": group[0]["question"], "code": None, "cached": {}, "intent": None, "convo": None}
+            for group in groups.values()
+        ]
+        jobs = list(pool.map(generate, jobs))
+        jobs = list(pool.map(execute, jobs))
+        jobs = list(pool.map(summarize, jobs))
+    stats.update(registry.stats, seconds=round(time.perf_counter() - start, 3))
+
+    by_key = {}
+    for key, job in zip(groups, jobs):
+        answer = {"question": job["question"], "code": job["code"], "cached": job["cached"]}
+        if "error" in job:
+            answer["error"] = job["error"]
+        else:
+            answer["variables"] = job["variables"]
+            answer["nth_summary"] = job["nth_summary"]
+            answer["summary"] = job["summary"]
+        by_key[key] = answer
+
+    answers = []
+    for request in requests:
+        answer = dict(by_key[answer_cache.normalise_question(request["question"])])
+        answer.update(id=request["id"], question=request["question"])
+        answers.append(answer)
+    return answers, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a file of Delhi weather questions.")
+    parser.add_argument("questions", help="text file, one question per line (or JSON lines); - for stdin")
+    parser.add_argument("-o", "--output", help="JSON-lines output file (default stdout)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-minute", type=int, default=60, help="LLM requests per minute")
+    parser.add_argument("--no-cache", action="store_true", help="always ask the model")
+    parser.add_argument("--no-fast-path", action="store_true", help="send every question to the model")
+    args = parser.parse_args()
+
+    if args.questions == "-":
+        requests = read_questions(sys.stdin)
+    else:
+        with open(args.questions, encoding="utf-8") as f:
+            requests = read_questions(f)
+
+    answers, stats = run_batch(
+        requests,
+        concurrency=args.concurrency,
+        per_minute=args.per_minute,
+        cache=None if args.no_cache else answer_cache.get_cache(),
+        semantic=None if args.no_cache else semantic_cache.get_cache(),
+        fast_path=not args.no_fast_path,
+    )
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for answer in answers:
+            out.write(json.dumps(answer, default=str) + "\n")
+    finally:
+        if args.output:
+            out.close()
+    print(f"✅ {stats['questions']} questions ({stats['unique']} unique), {stats['llm_requests']} LLM requests, "
+          f"{stats['calls']} analysis calls ({stats['coalesced']} shared) in {stats['seconds']}s", file=sys.stderr)
@@ -0,0 +1,124 @@
+# Paged, streaming scans over the Chroma collection.
+#
+# collection.get(..., limit=100000) loads every matching record at once and
+# silently stops at the limit; an all-years hourly query is already ~96k hours
+# per attribute and grows every year. These generators page through the
+# matches with offset/limit instead and yield compact (value, id) records, and
+# the reducers below consume them in bounded memory:
+#
+#   top_k          heap of the k best records, ties kept in collection order
+#   ValueCounter   Counter of distinct values, exact quantiles from it
+#
+# Hourly values have one decimal, so a Counter holds at most a few thousand
+# keys however many years are scanned.
+
+import heapq
+from collections import Counter
+
+PAGE_SIZE = 5000
+
+
+def scan_pages(collection, where, include=("metadatas",), page_size=PAGE_SIZE):
+    """
+    Yield collection.get results page by page for a where filter.
+    """
+    offset = 0
+    while True:
+        page = collection.get(where=where, limit=page_size, offset=offset, include=list(include))
+        if not page["ids"]:
+            return
+        yield page
+        if len(page["ids"]) < page_size:
+            return
+        offset += len(page["ids"])
+
+
+def scan_values(collection, where, value_of, page_size=PAGE_SIZE):
+    """
+    Yield (value, id) for every matching record with a valid value, in
+    collection order. value_of(doc, meta) extracts the number (None if it
+    cannot). Only metadata is transferred, except for pages holding records
+    without a "value" field, whose documents are fetched for value_of.
+    """
+    for page in scan_pages(collection, where, ("metadatas",), page_size):
+        documents = None
+        if any(meta is None or "value" not in meta for meta in page["metadatas"]):
+            fetched = collection.get(ids=page["ids"], include=["documents"])
+            by_id = dict(zip(fetched["ids"], fetched["documents"]))
+            documents = [by_id.get(record_id) for record_id in page["ids"]]
+        for i, (record_id, meta) in enumerate(zip(page["ids"], page["metadatas"])):
+            value = value_of(documents[i] if documents else None, meta)
+            if value is None or value != value:
+                continue
+            yield value, record_id
+
+
+def top_k(records, k, largest=True):
+    """
+    The k best (value, id) records, best first. Equal values keep their scan
+    order, exactly like numeric_engine.select_top on the materialised list.
+    """
+    if k <= 0:
+        return []
+    sign = 1 if largest else -1
+    heap = []   # (signed value, -position, value, id); heap[0] is the worst kept
+    for position, (value, record_id) in enumerate(records):
+        item = (sign * value, -position, value, record_id)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+    return [(value, record_id) for _, _, value, record_id in sorted(heap, reverse=True)]
+
+
+class ValueCounter:
+    """
+    Streaming multiset of values with exact quantiles (numpy's default
+    linear interpolation).
+    """
+
+    def __init__(self, values=()):
+        self.counts = Counter()
+        self.total = 0
+        self.update(values)
+
+    def update(self, values):
+        for value in values:
+            self.counts[value] += 1
+            self.total += 1
+        return self
+
+    def __len__(self):
+        return self.total
+
+    def _nth(self, ranks):
+        # Values at the given 0-based ranks (ascending) in one sorted pass
+        wanted = sorted(set(ranks))
+        found = {}
+        seen = 0
+        i = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            while i < len(wanted) and wanted[i] < seen:
+                found[wanted[i]] = value
+                i += 1
+            if i == len(wanted):
+                break
+        return found
+
+    def quantiles(self, qs):
+        if not self.total:
+            raise ValueError("No values to compute quantiles of.")
+        positions = [(self.total - 1) * q for q in qs]
+        ranks = []
+        for h in positions:
+            ranks += [int(h), min(int(h) + 1, self.total - 1)]
+        at = self._nth(ranks)
+        result = []
+        for h in positions:
+            low, high = at[int(h)], at[min(int(h) + 1, self.total - 1)]
+            result.append(low + (h - int(h)) * (high - low))
+        return result
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
@@ -0,0 +1,107 @@
+# Shared, lazily opened data handles.
+#
+# Importing dataanalysis or ask_ai used to open ./chroma and fail outright if
+# the collection did not exist yet. Every module now goes through this one
+# process-wide handle instead: the Chroma client and collections are opened on
+# first use (thread-safe), and warm_up() loads everything up front for
+# services that want the cost paid before the first request.
+
+import os
+import threading
+import time
+
+CHROMA_PATH = os.environ.get("CHROMA_PATH", "./chroma")
+COLLECTION_NAME = "delhi_weather"
+
+_client = None
+_collections = {}
+_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Process-wide chromadb.PersistentClient, opened on first use.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import chromadb
+                _client = chromadb.PersistentClient(path=CHROMA_PATH)
+    return _client
+
+
+def get_collection(name=COLLECTION_NAME, create=False, metadata=None):
+    """
+    Collection handle, opened once per process.
+
+    Parameters:
+        create: create the collection if missing (otherwise a missing
+            collection raises ValueError with a hint).
+        metadata: collection metadata used when creating it.
+    """
+    if name not in _collections:
+        client = get_client()
+        with _lock:
+            if name not in _collections:
+                if create:
+                    _collections[name] = client.get_or_create_collection(name=name, metadata=metadata)
+                else:
+                    try:
+                        _collections[name] = client.get_collection(name)
+                    except Exception as e:
+                        raise ValueError(
+                            f"Collection '{name}' not found in {CHROMA_PATH}; run embedding.py first. ({e})"
+                        ) from e
+    return _collections[name]
+
+
+def reset():
+    global _client
+    with _lock:
+        _client = None
+        _collections.clear()
+
+
+class LazyCollection:
+    """
+    Stand-in for a collection that opens it on first attribute access, so
+    `collection` can be imported and passed around without touching disk.
+    """
+
+    def __init__(self, name=COLLECTION_NAME):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(get_collection(self._name), attribute)
+
+    def __repr__(self):
+        return f"LazyCollection({self._name!r})"
+
+
+collection = LazyCollection()
+
+
+def warm_up(chroma=True, index=True, engine=False):
+    """
+    Open the data sources now instead of on the first question.
+
+    Returns:
+        {source: seconds taken}
+    """
+    timings = {}
+    if chroma:
+        start = time.perf_counter()
+        get_collection().count()
+        timings["chroma"] = round(time.perf_counter() - start, 3)
+    if index:
+        import dataanalysis
+        start = time.perf_counter()
+        dataanalysis._aggregates()
+        timings["aggregate_index"] = round(time.perf_counter() - start, 3)
+    if engine:
+        import numeric_engine
+        start = time.perf_counter()
+        numeric_engine.get_engine()
+        timings["numeric_engine"] = round(time.perf_counter() - start, 3)
+    return timings
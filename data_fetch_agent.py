@@ -2,13 +2,31 @@
 
 import requests
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+HOURLY_FIELDS = ["temperature_2m", "relativehumidity_2m", "windspeed_10m"]
+
+
+def archive_params(start_date, end_date):
+    return {
+        "latitude": 28.61,
+        "longitude": 77.21,
+        "start_date": start_date,
+        "end_date": end_date,
+        "hourly": ",".join(HOURLY_FIELDS),
+        "timezone": "Asia/Kolkata"
+    }
+
 
 def fetch_and_save(year, save_dir="data"):
     """
     Fetch data for a given year and save as JSON file.
     """
-    import os
     os.makedirs(save_dir, exist_ok=True)
 
     if year == datetime.now().year:
@@ -18,17 +36,7 @@ def fetch_and_save(year, save_dir="data"):
 
     start_date = f"{year}-01-01"
 
-    url = "https://archive-api.open-meteo.com/v1/archive"
-    params = {
-        "latitude": 28.61,
-        "longitude": 77.21,
-        "start_date": start_date,
-        "end_date": end_date,
-        "hourly": "temperature_2m,relativehumidity_2m,windspeed_10m",
-        "timezone": "Asia/Kolkata"
-    }
-
-    response = requests.get(url, params=params)
+    response = requests.get(ARCHIVE_URL, params=archive_params(start_date, end_date))
     if response.status_code == 200:
         data = response.json()
         file_path = os.path.join(save_dir, f"weather_delhi_{year}.json")
@@ -38,6 +46,166 @@ def fetch_and_save(year, save_dir="data"):
     else:
         print(f"❌ Failed for {year}. Status code: {response.status_code}")
 
-def fetch_all_years(start_year=2015, end_year=datetime.now().year, save_dir="data"):
+
+def make_session(pool_size=4, retries=3, backoff=0.5):
+    """
+    One pooled HTTP session shared by all year requests, retrying transient
+    failures (429 / 5xx / connection errors) with exponential backoff.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _load_stored(file_path):
+    if not os.path.exists(file_path):
+        return None
+    try:
+        with open(file_path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not data.get("hourly", {}).get("time"):
+        return None
+    return data
+
+
+def _last_filled_index(hourly):
+    """
+    Index of the last hour whose attributes are all present. The archive
+    returns trailing nulls for the most recent hours, so those are refetched.
+    """
+    times = hourly["time"]
+    for i in range(len(times) - 1, -1, -1):
+        if all(hourly.get(field, [None] * len(times))[i] is not None for field in HOURLY_FIELDS):
+            return i
+    return -1
+
+
+def plan_year(year, save_dir="data", today=None):
+    """
+    Decide what has to be downloaded for a year.
+
+    Returns:
+        None if the stored file already covers the whole (closed) year,
+        otherwise a dict with start_date, end_date and the stored data (or None).
+    """
+    today = today or datetime.now()
+    if year > today.year:
+        return None
+    end_date = today.strftime("%Y-%m-%d") if year == today.year else f"{year}-12-31"
+
+    stored = _load_stored(os.path.join(save_dir, f"weather_delhi_{year}.json"))
+    if stored is None:
+        return {"start_date": f"{year}-01-01", "end_date": end_date, "stored": None}
+
+    hourly = stored["hourly"]
+    last = _last_filled_index(hourly)
+    if year < today.year and last >= 0 and hourly["time"][last] == f"{year}-12-31T23:00":
+        return None
+    if last < 0:
+        return {"start_date": f"{year}-01-01", "end_date": end_date, "stored": None}
+
+    # Restart from the day of the last complete hour so partial days are replaced
+    start_date = hourly["time"][last][:10]
+    if start_date > end_date:
+        return None
+    return {"start_date": start_date, "end_date": end_date, "stored": stored}
+
+
+def _merge_hourly(stored, fetched, start_date):
+    """
+    Keep the stored hours before start_date and append everything fetched.
+    """
+    old = stored["hourly"]
+    keep = sum(1 for t in old["time"] if t[:10] < start_date)
+    merged = dict(fetched)
+    merged["hourly"] = {
+        key: old.get(key, [None] * len(old["time"]))[:keep] + values
+        for key, values in fetched["hourly"].items()
+    }
+    return merged
+
+
+def fetch_year_incremental(session, year, plan, save_dir="data", base_url=ARCHIVE_URL, timeout=60):
+    response = session.get(base_url, params=archive_params(plan["start_date"], plan["end_date"]), timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if plan["stored"] is not None:
+        data = _merge_hourly(plan["stored"], data, plan["start_date"])
+
+    file_path = os.path.join(save_dir, f"weather_delhi_{year}.json")
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def fetch_years_concurrently(start_year=2015, end_year=None, save_dir="data", max_workers=4,
+                             retries=3, backoff=0.5, base_url=ARCHIVE_URL, today=None):
+    """
+    Incremental fetch: closed years that are already complete on disk are skipped,
+    partially stored years are extended from their last stored hour, and the
+    remaining requests run concurrently over one pooled session.
+
+    Parameters:
+        start_year, end_year: inclusive range of years (end_year defaults to the current year)
+        save_dir: folder holding weather_delhi_{year}.json
+        max_workers: maximum number of requests in flight
+        retries, backoff: retry policy for transient HTTP failures
+        base_url: archive endpoint (point at a local stub server for tests)
+
+    Returns:
+        Dict {year: "skipped" | "updated" | "failed: <reason>"}
+    """
+    today = today or datetime.now()
+    end_year = end_year or today.year
+    os.makedirs(save_dir, exist_ok=True)
+
+    status = {}
+    plans = {}
+    for year in range(start_year, end_year + 1):
+        plan = plan_year(year, save_dir, today=today)
+        if plan is None:
+            status[year] = "skipped"
+        else:
+            plans[year] = plan
+
+    if not plans:
+        print("✅ All years already up to date.")
+        return status
+
+    workers = max(1, min(max_workers, len(plans)))
+    with make_session(pool_size=workers, retries=retries, backoff=backoff) as session:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(fetch_year_incremental, session, year, plan, save_dir, base_url): year
+                for year, plan in plans.items()
+            }
+            for future in as_completed(futures):
+                year = futures[future]
+                try:
+                    file_path = future.result()
+                    status[year] = "updated"
+                    print(f"✅ Data for {year} ({plans[year]['start_date']} → {plans[year]['end_date']}) saved to {file_path}!")
+                except Exception as e:
+                    status[year] = f"failed: {e}"
+                    print(f"❌ Failed for {year}: {e}")
+
+    return dict(sorted(status.items()))
+
+
+def fetch_all_years(start_year=2015, end_year=datetime.now().year, save_dir="data", incremental=False, max_workers=4):
+    if incremental:
+        return fetch_years_concurrently(start_year, end_year, save_dir=save_dir, max_workers=max_workers)
     for year in range(start_year, end_year + 1):
         fetch_and_save(year, save_dir=save_dir)
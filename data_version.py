@@ -0,0 +1,75 @@
+# Data version stamp.
+#
+# Ingestion bumps a stamp file after it changes the collection; the version also
+# folds in the weather JSON files on disk, so a new fetch changes it too. Caches
+# key their entries on current_version() and drop everything older.
+
+import os
+import time
+import uuid
+
+import weather_store
+
+VERSION_FILE = os.path.join("cache", "data_version")
+
+
+def _stamp():
+    try:
+        with open(VERSION_FILE, "r") as f:
+            return f.read().strip() or "0"
+    except OSError:
+        return "0"
+
+
+def _files_fingerprint(data_dir=weather_store.DATA_DIR):
+    years = weather_store.available_years(data_dir)
+    if not years:
+        return "nodata"
+    newest = max(os.path.getmtime(weather_store.json_path(year, data_dir)) for year in years)
+    return f"{years[0]}-{years[-1]}@{int(newest)}"
+
+
+def current_version():
+    return f"{_stamp()}:{_files_fingerprint()}"
+
+
+def bump_version():
+    """
+    Mark the embedded data as changed (called at the end of an ingest).
+    """
+    directory = os.path.dirname(VERSION_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    stamp = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    tmp_path = VERSION_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(stamp)
+    os.replace(tmp_path, VERSION_FILE)
+    return stamp
+
+
+class VersionCheck:
+    """
+    Tells a process-wide, in-memory copy of the data (engine arrays, aggregate
+    cube) when it is older than the data on disk. current_version() is read at
+    most once per interval seconds.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._version = None
+        self._checked = 0.0
+
+    def mark(self):
+        """
+        Record the version the copy is about to be loaded from.
+        """
+        self._version = current_version()
+        self._checked = time.monotonic()
+
+    def stale(self):
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return False
+        self._checked = now
+        return current_version() != self._version
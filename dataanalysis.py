@@ -1,11 +1,135 @@
-from chromadb import PersistentClient
-import pandas as pd
+import os
+import re
+import numpy as np
+import numeric_engine
+import range_engine
+import rolling_analytics
+import aggregate_index
+import chroma_scan
+import data_access
+import scan_cache
+
+# ✅ Chroma collection, opened on first use (see data_access)
+collection = data_access.collection
+
+# ✅ Backend: "chroma" parses the embedded documents, "numeric" answers from the hourly arrays.
+# Set per process with WEATHER_BACKEND / set_backend(), or per call with backend=...
+BACKENDS = ("chroma", "numeric")
+BACKEND = os.environ.get("WEATHER_BACKEND", "chroma")
+
+def set_backend(name):
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}'. Use one of {BACKENDS}.")
+    BACKEND = name
+
+def _numeric_engine(backend=None):
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Use one of {BACKENDS}.")
+    return numeric_engine.get_engine() if backend == "numeric" else None
+
+def _aggregates(backend=None):
+    # ✅ Precomputed year/month/day cube (None when there is no local data to build it from).
+    # Only for the numeric backend, so WEATHER_BACKEND=chroma / set_backend("chroma") reach Chroma.
+    if (backend or BACKEND) != "numeric":
+        _numeric_engine(backend)    # validates the name
+        return None
+    return aggregate_index.get_index()
+
+# First number after "was" in a sentence, for records embedded without a value field
+VALUE_PATTERN = re.compile(r"was\s+([-+]?\d*\.?\d+)")
+
+def _where(filters):
+    return {"$and": filters} if len(filters) > 1 else filters[0]
+
+def _hour_filters(attribute, year=None, month=None, day=None):
+    filters = [
+        {"type": {"$eq": "hour_record"}},
+        {"attribute": {"$eq": attribute}}
+    ]
+    if year:
+        filters.append({"year": {"$eq": year}})
+    if month:
+        filters.append({"month": {"$eq": month}})
+    if day:
+        filters.append({"day": {"$eq": day}})
+    return filters
 
-# ✅ Connect to Chroma collection
-client = PersistentClient(path="./chroma")
-collection = client.get_collection("delhi_weather")
+def _record_value(doc, meta):
+    """
+    Numeric value of a record: the metadata "value" field, or the number after
+    "was" in the text for records embedded without it. None if neither parses.
+    """
+    if meta and meta.get("value") is not None:
+        return float(meta["value"])
+    match = VALUE_PATTERN.search(doc or "")
+    return float(match.group(1)) if match else None
+
+def _hour_values(collection, filters):
+    """
+    Stream (value, id) for the hourly records matching filters: from the scan
+    cache when the same filter was scanned before, else page by page.
+    """
+    return scan_cache.get_cache().scan(collection, _where(filters), _record_value)
+
+def _cached_matches(collection, filters, keep):
+    """
+    (document, metadata) of the cached hourly records whose value passes
+    keep(values) (a numpy mask function), or None if filters are not cached.
+    """
+    cached = scan_cache.get_cache().peek(collection, _where(filters))
+    if cached is None:
+        return None
+    values, ids = cached
+    wanted = [ids[i] for i in np.flatnonzero(keep(values))]
+    records = []
+    for start in range(0, len(wanted), chroma_scan.PAGE_SIZE):
+        chunk = wanted[start:start + chroma_scan.PAGE_SIZE]
+        results = collection.get(ids=chunk, include=["documents", "metadatas"])
+        by_id = {i: (d, m) for i, d, m in zip(results["ids"], results["documents"], results["metadatas"])}
+        records.extend(by_id[i] for i in chunk if i in by_id)
+    return records
+
+def _records(collection, where):
+    """
+    Stream (document, metadata) for every record matching where, page by page.
+    """
+    for page in chroma_scan.scan_pages(collection, where, ("documents", "metadatas")):
+        yield from zip(page["documents"], page["metadatas"])
+
+def _documents(collection, ids):
+    """
+    Texts of the given record ids, in the same order.
+    """
+    if not ids:
+        return []
+    results = collection.get(ids=list(ids), include=["documents"])
+    by_id = dict(zip(results["ids"], results["documents"]))
+    return [by_id.get(record_id) for record_id in ids]
+
+def get_statistic(attribute, statistic, year=None, month=None, day=None, backend=None):
+    """
+    Summary statistic of an attribute for a year, month or day.
+
+    Parameters:
+        attribute: "temperature", "humidity", "wind_speed"
+        statistic: "mean", "median", "mode", "min", "max"
+        year, month, day: optional filters; no year means all years
+        backend: "chroma" or "numeric" (optional, defaults to BACKEND)
+
+    Returns:
+        Float rounded to two decimals, or a message string if no data.
+    """
+    index = _aggregates(backend)
+    if index is not None:
+        value = index.lookup(attribute, statistic, year, month, day)
+        return round(value, 2) if value is not None else "No data found."
+
+    engine = _numeric_engine(backend)
+    if engine is not None:
+        return engine.get_statistic(attribute, statistic, year, month, day)
 
-def get_statistic(attribute, statistic, year=None, month=None, day=None):
     filters = []
 
     if year and not month:
@@ -29,58 +153,38 @@ def get_statistic(attribute, statistic, year=None, month=None, day=None):
 
     where_filter = {"$and": filters}
 
-    results = collection.get(where=where_filter)
+    results = collection.get(where=where_filter, include=["documents", "metadatas"])
     if results["documents"]:
-        doc = results["documents"][0]
-        try:
-            value_str = doc.split("was")[1].split(".")[0]
-            value = float(value_str.strip())
-            return value
-        except Exception as e:
-            return f"⚠️ Could not parse numeric value: {e}"
+        value = _record_value(results["documents"][0], results["metadatas"][0])
+        if value is None:
+            return f"⚠️ Could not parse numeric value: {results['documents'][0]}"
+        return round(value, 2)
     else:
         return "No data found."
 
-def get_nth_highest_value(collection, n, attribute, year=None, month=None, day=None):
+def get_nth_highest_value(collection, n, attribute, year=None, month=None, day=None, backend=None):
     """
     Returns a dictionary with 'value', 'document', and 'n'.
-    """
-    filters = [
-        {"type": {"$eq": "hour_record"}},
-        {"attribute": {"$eq": attribute}}
-    ]
 
-    if year is not None:
-        filters.append({"year": {"$eq": year}})
-    if month is not None:
-        filters.append({"month": {"$eq": month}})
-    if day is not None:
-        filters.append({"day": {"$eq": day}})
+    The document is the hourly record's sentence, so it already carries the
+    timestamp of the n-th highest value.
+    """
+    engine = _numeric_engine(backend)
+    if engine is not None:
+        return engine.get_nth_highest_value(n, attribute, year, month, day)
 
-    results = collection.get(where={"$and": filters}, limit=100000)
+    # Stream every hour through a heap of the n highest; only the winner's text is fetched
+    top = chroma_scan.top_k(_hour_values(collection, _hour_filters(attribute, year, month, day)), n, largest=True)
 
-    # Extract numeric values and sort descending
-    values = []
-    for doc in results["documents"]:
-        try:
-            val_str = doc.split("was")[1].split("°")[0].strip()
-            val = float(val_str)
-            values.append((val, doc))
-        except:
-            continue
-
-    if not values or len(values) < n:
+    if n < 1 or len(top) < n:
         return {"value": None, "document": "No data available", "n": n}
 
-    # Sort and pick n-th highest
-    sorted_vals = sorted(values, key=lambda x: x[0], reverse=True)
-    nth_value, nth_doc = sorted_vals[n - 1]
-
-    return {"value": nth_value, "document": nth_doc, "n": n}
+    value, record_id = top[n - 1]
+    return {"value": value, "document": _documents(collection, [record_id])[0], "n": n}
 
 
 
-def get_nth_lowest_value(collection, n, attribute="temperature", year=None, month=None, day=None):
+def get_nth_lowest_value(collection, n, attribute="temperature", year=None, month=None, day=None, backend=None):
     """
     Get the n-th lowest value for a given attribute.
 
@@ -89,48 +193,30 @@ def get_nth_lowest_value(collection, n, attribute="temperature", year=None, mont
         n: int, e.g., 5 for 5th lowest
         attribute: "temperature", "humidity", "wind_speed"
         year, month, day: optional filters
+        backend: "chroma" or "numeric" (optional, defaults to BACKEND)
 
     Returns:
         Dictionary with value, document text, and metadata
     """
-    filters = [
-        {"type": {"$eq": "hour_record"}},
-        {"attribute": {"$eq": attribute}}
-    ]
-    if year:
-        filters.append({"year": {"$eq": year}})
-    if month:
-        filters.append({"month": {"$eq": month}})
-    if day:
-        filters.append({"day": {"$eq": day}})
-
-    where_filter = {"$and": filters}
+    engine = _numeric_engine(backend)
+    if engine is not None:
+        return engine.get_nth_lowest_value(n, attribute, year, month, day)
 
-    results = collection.get(where=where_filter, limit=100000)
+    # Stream every hour through a heap of the n lowest; only the winner's record is fetched
+    top = chroma_scan.top_k(_hour_values(collection, _hour_filters(attribute, year, month, day)), n, largest=False)
 
-    records = []
-    for doc, meta in zip(results["documents"], results["metadatas"]):
-        try:
-            value_str = doc.split(f"{attribute} was ")[1].split(" ")[0].replace("°C", "").replace("%", "").replace("m/s", "")
-            value = float(value_str)
-            records.append((value, doc, meta))
-        except Exception:
-            continue
-
-    if len(records) < n:
+    if n < 1 or len(top) < n:
         return None
 
-    # Sort ascending for lowest
-    records.sort(key=lambda x: x[0])
-
-    nth_record = records[n - 1]
+    value, record_id = top[n - 1]
+    record = collection.get(ids=[record_id], include=["documents", "metadatas"])
     return {
-        "value": nth_record[0],
-        "document": nth_record[1],
-        "metadata": nth_record[2]
+        "value": value,
+        "document": record["documents"][0],
+        "metadata": record["metadatas"][0]
     }
 
-def get_statistic_with_time(collection, attribute, statistic, year=None, month=None, day=None):
+def get_statistic_with_time(collection, attribute, statistic, year=None, month=None, day=None, backend=None):
     """
     Returns summary statistic value and also matches it with hourly records to get the time.
 
@@ -139,6 +225,7 @@ def get_statistic_with_time(collection, attribute, statistic, year=None, month=N
         attribute: "temperature", "humidity", "wind_speed"
         statistic: "mean", "median", "mode", "min", "max"
         year, month, day: optional filters
+        backend: "chroma" or "numeric" (optional, defaults to BACKEND)
 
     Returns:
         dict with:
@@ -146,7 +233,11 @@ def get_statistic_with_time(collection, attribute, statistic, year=None, month=N
             - "hours": list of dicts with year, month, day, hour, and text
                       or a string message if no exact match found
     """
-    summary_value = get_statistic(attribute, statistic, year, month, day)
+    engine = _numeric_engine(backend)
+    if engine is not None:
+        return engine.get_statistic_with_time(attribute, statistic, year, month, day)
+
+    summary_value = get_statistic(attribute, statistic, year, month, day, backend="chroma")
     if summary_value == "No data found.":
         return {"value": None, "hours": "No summary data found."}
 
@@ -155,34 +246,28 @@ def get_statistic_with_time(collection, attribute, statistic, year=None, month=N
     except ValueError:
         return {"value": None, "hours": f"Summary value '{summary_value}' could not be converted to float."}
 
-    where_filter = [
-        {"type": {"$eq": "hour_record"}},
-        {"attribute": {"$eq": attribute}}
-    ]
-    if year:
-        where_filter.append({"year": {"$eq": year}})
-    if month:
-        where_filter.append({"month": {"$eq": month}})
-    if day:
-        where_filter.append({"day": {"$eq": day}})
-
-    results = collection.get(where={"$and": where_filter}, limit=100000)
+    # Only hours within ±0.01 of the summary value are fetched, located in the
+    # cached hourly scan when there is one, else by a pushed-down range filter
+    hour_filters = _hour_filters(attribute, year, month, day)
+    records = _cached_matches(collection, hour_filters, lambda v: np.abs(v - summary_value_float) < 0.01)
+    if records is None:
+        where_filter = hour_filters + [
+            {"value": {"$gte": summary_value_float - 0.01}},
+            {"value": {"$lte": summary_value_float + 0.01}},
+        ]
+        records = _records(collection, _where(where_filter))
 
     matching_records = []
-    for doc, meta in zip(results["documents"], results["metadatas"]):
-        try:
-            val_str = doc.split(f"{attribute} was ")[1].split(" ")[0].replace("°C", "").replace("%", "")
-            val = float(val_str)
-            if abs(val - summary_value_float) < 0.01:
-                matching_records.append({
-                    "text": doc,
-                    "year": meta.get("year"),
-                    "month": meta.get("month"),
-                    "day": meta.get("day"),
-                    "hour": meta.get("hour")
-                })
-        except:
-            continue
+    for doc, meta in records:
+        val = _record_value(doc, meta)
+        if val is not None and abs(val - summary_value_float) < 0.01:
+            matching_records.append({
+                "text": doc,
+                "year": meta.get("year"),
+                "month": meta.get("month"),
+                "day": meta.get("day"),
+                "hour": meta.get("hour")
+            })
 
     if matching_records:
         return {"value": summary_value_float, "hours": matching_records}
@@ -195,17 +280,17 @@ def get_statistic_with_time(collection, attribute, statistic, year=None, month=N
 
     
 
-def get_minimum(attribute, year=None, month=None, day=None):
-    return get_statistic(attribute, "min", year, month, day)
+def get_minimum(attribute, year=None, month=None, day=None, backend=None):
+    return get_statistic(attribute, "min", year, month, day, backend=backend)
 
-def get_median(attribute, year=None, month=None, day=None):
-    return get_statistic(attribute, "median", year, month, day)
+def get_median(attribute, year=None, month=None, day=None, backend=None):
+    return get_statistic(attribute, "median", year, month, day, backend=backend)
 
-def get_mode(attribute, year=None, month=None, day=None):
-    return get_statistic(attribute, "mode", year, month, day)
+def get_mode(attribute, year=None, month=None, day=None, backend=None):
+    return get_statistic(attribute, "mode", year, month, day, backend=backend)
 
 
-def get_top_n(collection, attribute, n, year=None, month=None, ascending=False):
+def get_top_n(collection, attribute, n, year=None, month=None, ascending=False, backend=None):
     """
     Get top N records for an attribute, optionally filtered by year and/or month.
 
@@ -215,41 +300,17 @@ def get_top_n(collection, attribute, n, year=None, month=None, ascending=False):
         n: number of top records
         year, month: optional filters
         ascending: if True, return lowest; if False, highest
+        backend: "chroma" or "numeric" (optional, defaults to BACKEND)
 
     Returns:
         List of document strings
     """
-    filter_conditions = [
-        {"type": {"$eq": "hour_record"}},
-        {"attribute": {"$eq": attribute}}
-    ]
-    if year:
-        filter_conditions.append({"year": {"$eq": year}})
-    if month:
-        filter_conditions.append({"month": {"$eq": month}})
+    engine = _numeric_engine(backend)
+    if engine is not None:
+        return engine.get_top_n(attribute, n, year, month, ascending)
 
-    results = collection.get(
-        where={"$and": filter_conditions},
-        limit=100000
-    )
-
-    values = []
-    for doc in results["documents"]:
-        try:
-            val_str = doc.split("was")[1].split()[0]
-            val_str = val_str.replace("°C", "").replace("%", "").strip(".")
-            val = float(val_str)
-            values.append((val, doc))
-        except Exception as e:
-            print("Skipping doc due to parsing error:", doc)
-            print("Error:", e)
-            continue
-
-    if not values:
-        return []
-
-    values.sort(reverse=not ascending, key=lambda x: x[0])
-    return [doc for _, doc in values[:n]]
+    top = chroma_scan.top_k(_hour_values(collection, _hour_filters(attribute, year, month)), n, largest=not ascending)
+    return _documents(collection, [record_id for _, record_id in top])
 
 
 
@@ -257,7 +318,7 @@ import re
 
 import re
 
-def get_yearly_trend(collection, attribute, statistic="mean", year_range=None):
+def get_yearly_trend(collection, attribute, statistic="mean", year_range=None, backend=None):
     """
     Get yearly trend for an attribute and statistic (e.g., mean temperature).
     
@@ -266,10 +327,19 @@ def get_yearly_trend(collection, attribute, statistic="mean", year_range=None):
         attribute (str): "temperature", "humidity", or "wind_speed".
         statistic (str): "mean", "median", "mode", "min", or "max". Default "mean".
         year_range (tuple): (start_year, end_year). Default None means no filtering.
+        backend (str): "chroma" or "numeric". Default None means BACKEND.
 
     Returns:
         Dict {year: value rounded to two decimals}, sorted by year.
     """
+    index = _aggregates(backend)
+    if index is not None:
+        return index.trend(attribute, statistic, year_range=year_range) or "No data found for trend analysis."
+
+    engine = _numeric_engine(backend)
+    if engine is not None:
+        return engine.get_yearly_trend(attribute, statistic, year_range)
+
     where_filter = {
         "$and": [
             {"type": {"$eq": "year_summary"}},
@@ -278,19 +348,18 @@ def get_yearly_trend(collection, attribute, statistic="mean", year_range=None):
         ]
     }
 
-    results = collection.get(where=where_filter, limit=1000)
+    results = collection.get(where=where_filter, limit=1000, include=["documents", "metadatas"])
     trends = {}
 
-    for doc in results["documents"]:
+    for doc, meta in zip(results["documents"], results["metadatas"]):
         try:
-            # Extract year
-            year_str = doc.split("year ")[1].split(" ")[0]
-            year = int(year_str)
-
-            # Use regex to find first number after 'was'
-            match = re.search(r"was\s+([-+]?\d*\.\d+|\d+)", doc)
-            if match:
-                val = float(match.group(1))
+            # Year from metadata, else from the text
+            year = meta.get("year") if meta else None
+            if year is None:
+                year = int(doc.split("year ")[1].split(" ")[0])
+
+            val = _record_value(doc, meta)
+            if val is not None:
                 val = round(val, 2)
 
                 # Apply year_range filter if specified
@@ -321,7 +390,7 @@ import re
 
 import re
 
-def get_monthly_trend(collection, attribute, month, statistic="mean", year_range=None):
+def get_monthly_trend(collection, attribute, month, statistic="mean", year_range=None, backend=None):
     """
     Returns the trend for a specific month across different years,
     optionally filtered by a range of years.
@@ -332,10 +401,20 @@ def get_monthly_trend(collection, attribute, month, statistic="mean", year_range
         month (int): 1–12.
         statistic (str): "mean", "median", "max", "min", "mode". Default: "mean".
         year_range (tuple): (start_year, end_year) to filter years. Default: None.
+        backend (str): "chroma" or "numeric". Default: BACKEND.
 
     Returns:
         Dictionary mapping year to value for the month, rounded to two decimals.
     """
+    index = _aggregates(backend)
+    if index is not None:
+        trends = index.trend(attribute, statistic, month=month, year_range=year_range)
+        return trends or "No data found for monthly trend analysis in the specified years."
+
+    engine = _numeric_engine(backend)
+    if engine is not None:
+        return engine.get_monthly_trend(attribute, month, statistic, year_range)
+
     where_filter = {
         "$and": [
             {"type": {"$eq": "month_summary"}},
@@ -345,14 +424,15 @@ def get_monthly_trend(collection, attribute, month, statistic="mean", year_range
         ]
     }
 
-    results = collection.get(where=where_filter, limit=1000)
+    results = collection.get(where=where_filter, limit=1000, include=["documents", "metadatas"])
     trends = {}
 
-    for doc in results["documents"]:
+    for doc, meta in zip(results["documents"], results["metadatas"]):
         try:
-            # Extract year from text
-            year_part = doc.split("month ")[1].split("-")[0]
-            year_val = int(year_part)
+            # Year from metadata, else from the text
+            year_val = meta.get("year") if meta else None
+            if year_val is None:
+                year_val = int(doc.split("month ")[1].split("-")[0])
 
             # Apply year range filter if specified
             if year_range:
@@ -360,10 +440,8 @@ def get_monthly_trend(collection, attribute, month, statistic="mean", year_range
                 if not (start_year <= year_val <= end_year):
                     continue
 
-            # Use regex to extract value after "was"
-            match = re.search(r"was\s+([-+]?\d*\.\d+|\d+)", doc)
-            if match:
-                val = float(match.group(1))
+            val = _record_value(doc, meta)
+            if val is not None:
                 val = round(val, 2)
                 trends[year_val] = val
             else:
@@ -381,7 +459,7 @@ def get_monthly_trend(collection, attribute, month, statistic="mean", year_range
 
     
 
-def detect_outliers(collection, attribute="temperature", year=None, month=None, day=None):
+def detect_outliers(collection, attribute="temperature", year=None, month=None, day=None, backend=None):
     """
     Detect outliers for a given attribute using IQR method.
 
@@ -389,48 +467,38 @@ def detect_outliers(collection, attribute="temperature", year=None, month=None,
         collection: ChromaDB collection object
         attribute: "temperature", "humidity", or "wind_speed"
         year, month, day: optional filters
+        backend: "chroma" or "numeric" (optional, defaults to BACKEND)
 
     Returns:
         List of dictionaries with value, document, and metadata for each outlier.
     """
-    filters = {"type": "hour_record", "attribute": attribute}
-    if year:
-        filters["year"] = year
-    if month:
-        filters["month"] = month
-    if day:
-        filters["day"] = day
-
-    results = collection.get(where=filters, limit=100000)
+    engine = _numeric_engine(backend)
+    if engine is not None:
+        return engine.detect_outliers(attribute, year, month, day)
 
-    values = []
-    docs = []
+    filters = _hour_filters(attribute, year, month, day)
+    # First pass: exact quartiles from a streamed count of each distinct value
+    counts = chroma_scan.ValueCounter(value for value, _ in _hour_values(collection, filters))
 
-    for doc, meta in zip(results["documents"], results["metadatas"]):
-        try:
-            value_str = doc.split(f"{attribute} was ")[1].split(" ")[0].replace("°C", "").replace("%", "")
-            value = float(value_str)
-            values.append((value, doc, meta))
-        except Exception:
-            continue
-
-    if not values:
+    if not counts:
         return []
 
-    # Extract numerical values
-    numerical_values = [v[0] for v in values]
-
-    # Compute quartiles
-    q1 = pd.Series(numerical_values).quantile(0.25)
-    q3 = pd.Series(numerical_values).quantile(0.75)
+    q1, q3 = counts.quantiles([0.25, 0.75])
     iqr = q3 - q1
 
     lower_bound = q1 - 1.5 * iqr
     upper_bound = q3 + 1.5 * iqr
 
+    # Second pass: only the records outside the bounds, from the scan the first pass cached
+    records = _cached_matches(collection, filters, lambda v: (v < lower_bound) | (v > upper_bound))
+    if records is None:
+        outlier_filter = filters + [{"$or": [{"value": {"$lt": lower_bound}}, {"value": {"$gt": upper_bound}}]}]
+        records = _records(collection, _where(outlier_filter))
+
     outliers = []
-    for val, doc, meta in values:
-        if val < lower_bound or val > upper_bound:
+    for doc, meta in records:
+        val = _record_value(doc, meta)
+        if val is not None and (val < lower_bound or val > upper_bound):
             outliers.append({
                 "value": val,
                 "document": doc,
@@ -439,6 +507,103 @@ def detect_outliers(collection, attribute="temperature", year=None, month=None,
 
     return outliers
 
+def get_range_statistic(attribute, statistic, start=None, end=None, days=None):
+    """
+    Summary statistic of an attribute over any date or time range.
+
+    Parameters:
+        attribute: "temperature", "humidity", "wind_speed"
+        statistic: "mean", "median", "mode", "min", "max"
+        start, end: "YYYY-MM-DD" or "YYYY-MM-DD HH:MM", both inclusive; omitted means the first/last hour on record
+        days: instead of start, the last N days up to end (e.g. days=30 for "the last 30 days")
+
+    Returns:
+        Float rounded to two decimals, or a message string if no data.
+    """
+    value = range_engine.get_range_engine().statistic(attribute, statistic, start, end, days)
+    return round(value, 2) if value is not None else "No data found."
+
+def get_range_extreme(attribute, start=None, end=None, largest=True, days=None):
+    """
+    Highest (or lowest) hourly value of an attribute over any date or time range, with when it happened.
+
+    Parameters:
+        attribute: "temperature", "humidity", "wind_speed"
+        start, end: "YYYY-MM-DD" or "YYYY-MM-DD HH:MM", both inclusive
+        largest: True for the maximum, False for the minimum
+        days: instead of start, the last N days up to end
+
+    Returns:
+        dict with value, document and metadata of the earliest hour holding the extreme, or a message string if no data.
+    """
+    result = range_engine.get_range_engine().extreme(attribute, start, end, days, largest)
+    return result if result is not None else "No data found."
+
+def get_extreme_window(attribute, hours, start=None, end=None, largest=True):
+    """
+    Warmest/coolest (or most/least humid, windiest/calmest) stretch of a given length within a range, e.g. the coolest week of May.
+
+    Parameters:
+        attribute: "temperature", "humidity", "wind_speed"
+        hours: window length in hours (24 for a day, 168 for a week)
+        start, end: "YYYY-MM-DD" or "YYYY-MM-DD HH:MM", both inclusive
+        largest: True for the highest average, False for the lowest
+
+    Returns:
+        dict with mean, start, end (first and last hour) and hours (hours with data), or a message string if no data.
+    """
+    result = range_engine.get_range_engine().extreme_window(attribute, hours, start, end, largest)
+    if result is None:
+        return "No data found."
+    return dict(result, mean=round(result["mean"], 2))
+
+def get_moving_statistic(attribute, statistic, hours, start=None, end=None):
+    """
+    Moving (rolling) mean, min or max of an attribute, one value per day, e.g. the 7-day moving average of humidity in July.
+
+    Parameters:
+        attribute: "temperature", "humidity", "wind_speed"
+        statistic: "mean", "min", "max"
+        hours: window length in hours (168 for 7 days); each window ends at that day's last hour
+        start, end: "YYYY-MM-DD" or "YYYY-MM-DD HH:MM", both inclusive
+
+    Returns:
+        Dict {"YYYY-MM-DD": value rounded to two decimals}, sorted by day.
+    """
+    return rolling_analytics.moving_statistic(range_engine.get_range_engine(), attribute, statistic, hours, start, end)
+
+def get_threshold_runs(attribute, threshold, above=True, start=None, end=None, daily=False, n=5):
+    """
+    Longest stretches of consecutive hours (or days) above or below a threshold, e.g. heatwaves and cold spells.
+
+    Parameters:
+        attribute: "temperature", "humidity", "wind_speed"
+        threshold: value to compare with, e.g. 40 for "above 40°C"
+        above: True for values above threshold, False for below
+        start, end: "YYYY-MM-DD" or "YYYY-MM-DD HH:MM", both inclusive
+        daily: count consecutive days whose max (or min, when below) crosses threshold instead of hours
+        n: number of stretches to return
+
+    Returns:
+        List of up to n dicts with start, end, hours (or days) and peak value, longest first.
+    """
+    return rolling_analytics.threshold_runs(range_engine.get_range_engine(), attribute, threshold, above, start, end, daily, n)
+
+def get_degree_hours(attribute, base, above=True, start=None, end=None):
+    """
+    Degree-hours: the sum over hours of how far an attribute went above (or below) a base value, e.g. cooling degree-hours over 24°C.
+
+    Parameters:
+        attribute: "temperature", "humidity", "wind_speed"
+        base: base value, e.g. 24 for cooling or 18 for heating degree-hours
+        above: True to accumulate excess above base, False for shortfall below it
+        start, end: "YYYY-MM-DD" or "YYYY-MM-DD HH:MM", both inclusive
+
+    Returns:
+        Dict with degree_hours, hours (hours beyond base) and total_hours.
+    """
+    return rolling_analytics.degree_hours(range_engine.get_range_engine(), attribute, base, above, start, end)
+
 
 import json
 import statistics
@@ -1,32 +1,42 @@
 import os
+import argparse
+import calendar
+import hashlib
 import json
+import queue
+import threading
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 from sentence_transformers import SentenceTransformer
 import chromadb
+import weather_store
+import embedding_cache
+import data_version
 
 # ✅ Load embedding model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+model = SentenceTransformer(embedding_cache.MODEL_NAME)
 
 # ✅ Initialize Chroma client
 client = chromadb.PersistentClient(path="./chroma")
 collection = client.get_or_create_collection(name="delhi_weather")
 
-def process_file(file_path):
-    with open(file_path, "r") as f:
-        data = json.load(f)
+def _as_source_dtype(values):
+    # float32 -> the float64/int64 values json.load would have produced
+    values = values.astype("float64").round(2)
+    if not np.isnan(values).any() and (values == np.floor(values)).all():
+        return values.astype("int64")
+    return values
 
-    hourly = data.get("hourly", {})
-    times = hourly.get("time", [])
-    temps = hourly.get("temperature_2m", [])
-    humidities = hourly.get("relativehumidity_2m", [])
-    winds = hourly.get("windspeed_10m", [])
+def process_file(file_path):
+    # Typed columns are memory-mapped from the .npy cache next to the JSON
+    columns = weather_store.load_file(file_path)
 
     df = pd.DataFrame({
-        "time": pd.to_datetime(times),
-        "temperature": temps,
-        "humidity": humidities,
-        "wind_speed": winds,
+        "time": pd.to_datetime(weather_store.to_datetime64(columns["time"])),
+        "temperature": _as_source_dtype(columns["temperature"]),
+        "humidity": _as_source_dtype(columns["humidity"]),
+        "wind_speed": _as_source_dtype(columns["wind_speed"]),
     })
     df["year"] = df["time"].dt.year
     df["month"] = df["time"].dt.month
@@ -34,121 +44,309 @@ def process_file(file_path):
     df["hour"] = df["time"].dt.hour
     return df
 
-def describe_stat(series):
-    return {
-        "mean": series.mean(),
-        "median": series.median(),
-        "mode": series.mode().iloc[0] if not series.mode().empty else None,
-        "min": series.min(),
-        "max": series.max()
-    }
-
-def generate_stat_texts(period_str, attr_name, stats, period_type):
-    texts = [
-        f"{period_str}, the mean {attr_name} was {stats['mean']:.2f}{'°C' if attr_name=='temperature' else '%' if attr_name=='humidity' else ' m/s'}.",
-        f"{period_str}, the median {attr_name} was {stats['median']:.2f}{'°C' if attr_name=='temperature' else '%' if attr_name=='humidity' else ' m/s'}.",
-        f"{period_str}, the mode {attr_name} was {stats['mode']}{'°C' if attr_name=='temperature' else '%' if attr_name=='humidity' else ' m/s'}.",
-        f"{period_str}, the minimum {attr_name} was {stats['min']:.2f}{'°C' if attr_name=='temperature' else '%' if attr_name=='humidity' else ' m/s'}.",
-        f"{period_str}, the maximum {attr_name} was {stats['max']:.2f}{'°C' if attr_name=='temperature' else '%' if attr_name=='humidity' else ' m/s'}."
-    ]
-    return texts
+# (column, id tag, label in text, unit)
+ATTRIBUTES = [
+    ("temperature", "temp", "temperature", "°C"),
+    ("humidity", "hum", "humidity", "%"),
+    ("wind_speed", "wind", "wind speed", " m/s"),
+]
+# (statistic, word in text)
+STATISTICS = [("mean", "mean"), ("median", "median"), ("mode", "mode"), ("min", "minimum"), ("max", "maximum")]
+LEVELS = [("day", ["year", "month", "day"]), ("month", ["year", "month"]), ("year", ["year"])]
+MONTH_NAMES = np.array(calendar.month_name, dtype=object)
+
+def _as_str(series):
+    # numpy's str() of each value ("12.2", "85", "nan"), like the f-strings it replaces
+    return pd.Series(series.to_numpy().astype(str), index=series.index, dtype=object)
+
+def _hourly_records(df):
+    t_str = df["time"].dt.strftime("%Y-%m-%d %H:%M:%S").astype(object)
+    year_str = _as_str(df["year"])
+    idx_str = pd.Series(df.index.to_numpy().astype(str), index=df.index, dtype=object)
+    frames = []
+    for col, tag, label, unit in ATTRIBUTES:
+        frames.append(pd.DataFrame({
+            "id": year_str + f"_hour_{tag}_" + idx_str,
+            "document": "On " + t_str + f" in Delhi, the {label} was " + _as_str(df[col]) + f"{unit}.",
+            "type": "hour_record",
+            "year": df["year"],
+            "month": df["month"],
+            "day": df["day"],
+            "hour": df["hour"],
+            "attribute": col,
+            "value": df[col].astype("float64"),
+        }))
+    return frames
+
+def _group_mode(df, keys, col):
+    # Smallest of the most frequent values per group (pandas Series.mode()[0])
+    counts = df.groupby(keys + [col]).size().reset_index(name="_n")
+    counts = counts.sort_values(keys + ["_n", col], ascending=[True] * len(keys) + [False, True])
+    return counts.drop_duplicates(subset=keys).set_index(keys)[col]
+
+def _summary_records(df, level, keys):
+    cols = [col for col, _, _, _ in ATTRIBUTES]
+    stats = df.groupby(keys)[cols].agg(["mean", "median", "min", "max"])
+    groups = stats.index.to_frame(index=False)
+    y = _as_str(groups["year"])
+
+    if level == "day":
+        m, d = _as_str(groups["month"]), _as_str(groups["day"])
+        period = "On " + y + "-" + m.str.zfill(2) + "-" + d.str.zfill(2) + " in Delhi"
+        prefix = y + "_" + m + "_" + d + "_day"
+    elif level == "month":
+        m = _as_str(groups["month"])
+        period = "In " + pd.Series(MONTH_NAMES[groups["month"].to_numpy()]) + " " + y + " in Delhi"
+        prefix = y + "_" + m + "_month"
+    else:
+        period = "In " + y + " in Delhi"
+        prefix = y + "_year"
+
+    frames = []
+    for col, tag, label, unit in ATTRIBUTES:
+        mode = _group_mode(df, keys, col)
+        mode_str = pd.Series("None", index=stats.index, dtype=object)
+        mode_str.loc[mode.index] = mode.to_numpy().astype(str)
+        mode_value = mode.astype("float64").reindex(stats.index).to_numpy()
+
+        for i, (stat, word) in enumerate(STATISTICS):
+            if stat == "mode":
+                numbers = mode_value
+                values = mode_str.reset_index(drop=True)
+            else:
+                numbers = stats[(col, stat)].to_numpy(dtype="float64")
+                values = pd.Series(np.char.mod("%.2f", numbers))
+            frame = groups.copy()
+            frame.insert(0, "document", period + f", the {word} {label} was " + values + f"{unit}.")
+            frame.insert(0, "id", prefix + f"_{tag}_{i}")
+            frame["type"] = f"{level}_summary"
+            frame["attribute"] = col
+            frame["statistic"] = stat
+            frame["value"] = numbers
+            frames.append(frame)
+    return frames
+
+def build_corpus(df):
+    """
+    Build every hourly record and day/month/year summary for one year's DataFrame
+    (as returned by process_file) with vectorised pandas operations.
+
+    Returns:
+        (ids, documents, metadatas) as aligned lists. Metadata carries type, year,
+        month, day, hour, attribute and statistic where they apply, plus the numeric
+        value (omitted when missing, as Chroma metadata cannot hold NaN/None).
+    """
+    frames = _hourly_records(df)
+    for level, keys in LEVELS:
+        frames.extend(_summary_records(df, level, keys))
+
+    ids, documents, metadatas = [], [], []
+    for frame in frames:
+        ids.extend(frame["id"].tolist())
+        documents.extend(frame["document"].tolist())
+        meta_cols = [c for c in frame.columns if c not in ("id", "document")]
+        records = frame[meta_cols].to_dict("records")
+        if frame["value"].isna().any():
+            for meta in records:
+                if meta["value"] != meta["value"]:
+                    del meta["value"]
+        metadatas.extend(records)
+    return ids, documents, metadatas
 
 def chunk_list(lst, chunk_size):
     for i in range(0, len(lst), chunk_size):
         yield lst[i:i + chunk_size]
 
-if __name__ == "__main__":
-    all_texts = []
-    all_ids = []
-
-    for year in range(2015, 2026):
-        file_name = f"weather_delhi_{year}.json"
-        if not os.path.exists(file_name):
-            continue
-
-        print(f"⚡ Processing {file_name}...")
-        df = process_file(file_name)
-
-        # ✅ Hourly individual records (3 separate lines per row)
-        for idx, row in df.iterrows():
-            t_str = row['time']
-            all_texts.append(f"On {t_str} in Delhi, the temperature was {row['temperature']}°C.")
-            all_ids.append(f"{year}_hour_temp_{idx}")
-
-            all_texts.append(f"On {t_str} in Delhi, the humidity was {row['humidity']}%.")
-            all_ids.append(f"{year}_hour_hum_{idx}")
-
-            all_texts.append(f"On {t_str} in Delhi, the wind speed was {row['wind_speed']} m/s.")
-            all_ids.append(f"{year}_hour_wind_{idx}")
-
-        # ✅ Day-level summaries
-        grouped_day = df.groupby(["year", "month", "day"])
-        for keys, group_df in grouped_day:
-            y, m, d = keys
-            period_str = f"On {y}-{m:02d}-{d:02d} in Delhi"
-
-            temp_stats = describe_stat(group_df["temperature"])
-            hum_stats = describe_stat(group_df["humidity"])
-            wind_stats = describe_stat(group_df["wind_speed"])
-
-            all_texts.extend(generate_stat_texts(period_str, "temperature", temp_stats, "day"))
-            all_ids.extend([f"{y}_{m}_{d}_day_temp_{i}" for i in range(5)])
-
-            all_texts.extend(generate_stat_texts(period_str, "humidity", hum_stats, "day"))
-            all_ids.extend([f"{y}_{m}_{d}_day_hum_{i}" for i in range(5)])
-
-            all_texts.extend(generate_stat_texts(period_str, "wind speed", wind_stats, "day"))
-            all_ids.extend([f"{y}_{m}_{d}_day_wind_{i}" for i in range(5)])
+# ✅ Incremental ingestion: per-year manifest of id -> content hash
+MANIFEST_DIR = "embedding_manifests"
+
+def content_hash(document, metadata):
+    payload = document + "\x1f" + json.dumps(metadata, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def manifest_path(year):
+    return os.path.join(MANIFEST_DIR, f"{year}.json")
+
+def load_manifest(year):
+    path = manifest_path(year)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_manifest(year, manifest):
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    path = manifest_path(year)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def diff_manifest(manifest, ids, hashes):
+    """
+    Returns:
+        (positions of new or changed records, ids that are no longer produced)
+    """
+    changed = [i for i, (record_id, h) in enumerate(zip(ids, hashes)) if manifest.get(record_id) != h]
+    current = set(ids)
+    removed = [record_id for record_id in manifest if record_id not in current]
+    return changed, removed
+
+# ✅ Streaming ingestion: producer -> encoder -> writer thread
+def corpus_batches(years, incremental=False, batch_size=1000):
+    """
+    Producer: yields work items one year at a time, so only a single year's
+    corpus is held in memory.
+
+    Items:
+        ("delete", year, ids)
+        ("upsert", year, ids, documents, metadatas, hashes)
+        ("year_done", year)
+    """
+    for year in years:
+        df = process_file(weather_store.json_path(year))
+        ids, documents, metadatas = build_corpus(df)
+        hashes = [content_hash(doc, meta) for doc, meta in zip(documents, metadatas)]
+        if incremental:
+            changed, removed = diff_manifest(load_manifest(year), ids, hashes)
+        else:
+            changed, removed = range(len(ids)), []
+
+        for id_chunk in chunk_list(removed, batch_size):
+            yield ("delete", year, id_chunk)
+        for positions in chunk_list(changed, batch_size):
+            yield (
+                "upsert", year,
+                [ids[i] for i in positions],
+                [documents[i] for i in positions],
+                [metadatas[i] for i in positions],
+                [hashes[i] for i in positions],
+            )
+        yield ("year_done", year)
+
+def make_encoder(workers=1, batch_size=64, threads=None, use_cache=True):
+    """
+    Returns (encode, close). workers > 1 starts a sentence-transformers
+    multi-process CPU pool; otherwise the single model runs with the given
+    batch size and torch thread count. With use_cache, sentences already in
+    the embedding cache are not encoded again.
+    """
+    close = lambda: None
+    if workers > 1:
+        pool = model.start_multi_process_pool(target_devices=["cpu"] * workers)
+        def raw_encode(texts):
+            return model.encode_multi_process(texts, pool, batch_size=batch_size)
+        def close():
+            model.stop_multi_process_pool(pool)
+    else:
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        def raw_encode(texts):
+            return model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+
+    if not use_cache:
+        return raw_encode, close
+    cache = embedding_cache.get_cache()
+    return (lambda texts: cache.encode(texts, raw_encode)), close
+
+def _write_items(items, incremental, counts, errors):
+    """
+    Writer thread: upserts/deletes in Chroma and keeps the year's manifest in
+    step with what has actually been written.
+    """
+    manifests = {}
+    try:
+        while True:
+            item = items.get()
+            if item is None:
+                return
+            kind, year = item[0], item[1]
+            if year not in manifests:
+                manifests[year] = load_manifest(year) if incremental else {}
+            manifest = manifests[year]
+
+            if kind == "delete":
+                collection.delete(ids=item[2])
+                for record_id in item[2]:
+                    manifest.pop(record_id, None)
+                counts["deleted"] += len(item[2])
+            elif kind == "upsert":
+                _, _, ids, documents, metadatas, hashes, embeddings = item
+                collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+                manifest.update(zip(ids, hashes))
+                counts["upserted"] += len(ids)
+                # Saved per batch so an interrupted run resumes where it stopped
+                save_manifest(year, manifest)
+            elif kind == "year_done":
+                save_manifest(year, manifests.pop(year))
+                print(f"⚡ {year}: done ({counts['upserted']} upserted, {counts['deleted']} deleted so far).")
+    except Exception as e:
+        errors.append(e)
+        # Keep draining so the producer never blocks on a full queue
+        while items.get() is not None:
+            pass
+
+def ingest(years, incremental=False, batch_size=1000, encode_batch_size=64, workers=1, threads=None, queue_size=4,
+           use_cache=True):
+    """
+    Stream years through encode -> upsert with encoding and DB writes overlapping.
+    Peak memory is one year's corpus plus queue_size encoded batches.
+
+    Returns:
+        Dict with the number of upserted and deleted records.
+    """
+    counts = {"upserted": 0, "deleted": 0}
+    errors = []
+    items = queue.Queue(maxsize=queue_size)
+    writer = threading.Thread(target=_write_items, args=(items, incremental, counts, errors), daemon=True)
+    writer.start()
+
+    encode, close = make_encoder(workers, encode_batch_size, threads, use_cache)
+    try:
+        for item in tqdm(corpus_batches(years, incremental, batch_size), desc="batches"):
+            if errors:
+                break
+            if item[0] == "upsert":
+                item = item + (encode(item[3]),)
+            items.put(item)
+    finally:
+        items.put(None)
+        writer.join()
+        close()
+
+    if errors:
+        raise errors[0]
+    if counts["upserted"] or counts["deleted"]:
+        data_version.bump_version()
+    return counts
 
-        # ✅ Month-level summaries
-        grouped_month = df.groupby(["year", "month"])
-        for keys, group_df in grouped_month:
-            y, m = keys
-            period_str = f"In {pd.to_datetime(f'{y}-{m}-01').strftime('%B %Y')} in Delhi"
-
-            temp_stats = describe_stat(group_df["temperature"])
-            hum_stats = describe_stat(group_df["humidity"])
-            wind_stats = describe_stat(group_df["wind_speed"])
-
-            all_texts.extend(generate_stat_texts(period_str, "temperature", temp_stats, "month"))
-            all_ids.extend([f"{y}_{m}_month_temp_{i}" for i in range(5)])
-
-            all_texts.extend(generate_stat_texts(period_str, "humidity", hum_stats, "month"))
-            all_ids.extend([f"{y}_{m}_month_hum_{i}" for i in range(5)])
-
-            all_texts.extend(generate_stat_texts(period_str, "wind speed", wind_stats, "month"))
-            all_ids.extend([f"{y}_{m}_month_wind_{i}" for i in range(5)])
-
-        # ✅ Year-level summaries
-        grouped_year = df.groupby(["year"])
-        for y, group_df in grouped_year:
-            period_str = f"In {y} in Delhi"
-
-            temp_stats = describe_stat(group_df["temperature"])
-            hum_stats = describe_stat(group_df["humidity"])
-            wind_stats = describe_stat(group_df["wind_speed"])
-
-            all_texts.extend(generate_stat_texts(period_str, "temperature", temp_stats, "year"))
-            all_ids.extend([f"{y}_year_temp_{i}" for i in range(5)])
-
-            all_texts.extend(generate_stat_texts(period_str, "humidity", hum_stats, "year"))
-            all_ids.extend([f"{y}_year_hum_{i}" for i in range(5)])
-
-            all_texts.extend(generate_stat_texts(period_str, "wind speed", wind_stats, "year"))
-            all_ids.extend([f"{y}_year_wind_{i}" for i in range(5)])
-
-    # ✅ Clear old records first (optional)
-    #print("🗑️ Deleting old records...")
-    #collection.delete(where={})
-
-    # ✅ Chunk embeddings to avoid memory issues
-    chunk_size = 500
-    for text_chunk, id_chunk in zip(chunk_list(all_texts, chunk_size), chunk_list(all_ids, chunk_size)):
-        embeddings = model.encode(text_chunk, show_progress_bar=True)
-        collection.add(
-            documents=text_chunk,
-            embeddings=embeddings,
-            ids=id_chunk
-        )
-
-    print("🎉 All embeddings inserted successfully!")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embed the Delhi weather data into Chroma.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only encode records whose text changed since the last run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="encoder processes (1 = single in-process model)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch threads for the single-process encoder")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="records per upsert batch")
+    parser.add_argument("--encode-batch-size", type=int, default=64,
+                        help="sentences per model forward pass")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="encode every sentence instead of using the embedding cache")
+    args = parser.parse_args()
+
+    counts = ingest(
+        weather_store.available_years(),
+        incremental=args.incremental,
+        batch_size=args.batch_size,
+        encode_batch_size=args.encode_batch_size,
+        workers=args.workers,
+        threads=args.threads,
+        use_cache=not args.no_cache,
+    )
+    print(f"🎉 Ingestion finished: {counts['upserted']} upserted, {counts['deleted']} deleted.")
+    if not args.no_cache:
+        stats = embedding_cache.get_cache().stats
+        print(f"🧠 Embedding cache: {stats['memory_hits'] + stats['disk_hits']} hit(s), {stats['misses']} sentence(s) encoded.")
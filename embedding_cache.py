@@ -0,0 +1,153 @@
+# Content-addressed embedding cache.
+#
+# sha1(model name + text) -> float32 vector, kept in an in-memory LRU in front
+# of a SQLite file, so a sentence is encoded at most once across runs. Used by
+# the ingestion pipeline in embedding.py and for query-time encoding.
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+CACHE_PATH = os.path.join("cache", "embeddings.sqlite")
+
+
+def text_key(text, model_name=MODEL_NAME):
+    return hashlib.sha1(f"{model_name}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path=CACHE_PATH, model_name=MODEL_NAME, max_memory_items=50000):
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._db.commit()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _load_from_disk(self, keys):
+        found = {}
+        keys = list(keys)
+        # SQLite caps the number of bound parameters per statement
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def encode(self, texts, encode_fn):
+        """
+        Embeddings for texts, calling encode_fn(list_of_texts) only for strings
+        never seen before (each distinct string once).
+
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        keys = [text_key(text, self.model_name) for text in texts]
+        vectors = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory and key not in vectors:
+                    vectors[key] = self._memory[key]
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+
+            missing = {key for key in keys if key not in vectors}
+            if missing:
+                from_disk = self._load_from_disk(missing)
+                self.stats["disk_hits"] += len(from_disk)
+                for key, vector in from_disk.items():
+                    vectors[key] = vector
+                    self._remember(key, vector)
+
+        to_encode = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in to_encode:
+                to_encode[key] = text
+        if to_encode:
+            encoded = np.asarray(encode_fn(list(to_encode.values())), dtype=np.float32)
+            with self._lock:
+                self.stats["misses"] += len(to_encode)
+                rows = []
+                for key, vector in zip(to_encode, encoded):
+                    vector = np.ascontiguousarray(vector)
+                    vectors[key] = vector
+                    self._remember(key, vector)
+                    rows.append((key, vector.tobytes()))
+                self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                self._db.commit()
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CachedEmbeddingFunction:
+    """
+    Chroma-compatible embedding function (for query_texts=...) that goes through the cache.
+    """
+
+    def __init__(self, cache=None, model=None):
+        self.cache = cache
+        self.model = model
+
+    def __call__(self, input):
+        cache = self.cache or get_cache()
+        model = self.model or get_model()
+        vectors = cache.encode(list(input), lambda texts: model.encode(texts, show_progress_bar=False))
+        return [vector for vector in vectors]
+
+
+def cached_query(collection, query_texts, n_results=5, **kwargs):
+    """
+    collection.query(query_texts=...) with the question embeddings served from the cache.
+    """
+    embeddings = CachedEmbeddingFunction()(query_texts)
+    return collection.query(query_embeddings=embeddings, n_results=n_results, **kwargs)
+
+
+_cache = None
+_model = None
+_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+
+def get_model():
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME)
+    return _model
@@ -0,0 +1,261 @@
+# Rule-based fast path for simple questions.
+#
+# Most questions name one attribute, one statistic or direction, a period and
+# maybe N: "max temperature in 2018", "mean humidity March 2019", "5 hottest
+# hours in May 2020". parse_intent turns such a question into the same code
+# Gemini would write, so it runs through run_generated_code and the caches as
+# usual, and describe_result phrases the answer without a summary call.
+#
+# Anything ambiguous (two attributes, two years outside a range, words the
+# parser does not understand, comparisons) returns None and goes to the LLM.
+
+import re
+
+import answer_cache
+import numeric_engine
+import semantic_cache
+
+# Share of the question's words the parser understood. Any unknown word could be
+# a qualifier the call cannot express ("morning", "3pm"), so all must be known.
+MIN_CONFIDENCE = 1.0
+
+ATTRIBUTE_WORDS = {
+    attribute: words + {"temperature": ["temparature", "temprature", "temperatures"],
+                        "humidity": ["humidities"],
+                        "wind_speed": ["winds"]}[attribute]
+    for attribute, words in semantic_cache.ATTRIBUTE_WORDS.items()
+}
+STATISTIC_DIRECTIONS = {"high": "max", "low": "min", "mean": "mean", "median": "median", "mode": "mode"}
+ORDINAL_WORDS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+                 "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10}
+COUNT_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+               "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+MONTH_PATTERN = "|".join(f"{m[:3]}(?:{m[3:]})?" for m in semantic_cache.MONTH_NAMES)
+TIME_WORDS = ["when", "time", "date", "hour"]
+RECORD_WORDS = ["hours", "records", "readings", "values", "observations", "times"]
+# "hottest day" / "driest month" ask for a daily or monthly aggregate ranking
+PERIOD_RANK_WORDS = {"day", "days", "week", "weeks", "month", "months", "season", "seasons"}
+
+# Words that carry no meaning of their own in these questions
+FILLER_WORDS = set("""
+a an the of in on at for during by to from and between across through over
+what whats was is were be been which who did does do it its ever all overall
+tell me show give list find get fetch return please i want know
+delhi weather data recorded record records reading readings value values
+hour hours year years speed level levels time times date s
+observed observations measured there has have
+""".split())
+
+# Questions that need reasoning across results always go to the LLM
+BLOCK_WORDS = {"compare", "comparison", "difference", "versus", "vs", "than", "correlation", "correlate",
+               "why", "how", "predict", "forecast", "not", "except", "without",
+               "interesting", "overview", "insight", "insights", "change", "increase", "decrease", "summary"}
+# Time-of-day and relative periods have no year/month/day filter to map onto
+QUALIFIER_WORDS = {"morning", "mornings", "afternoon", "afternoons", "evening", "evenings", "night", "nights",
+                   "nighttime", "daytime", "noon", "midnight", "dawn", "dusk", "am", "pm",
+                   "last", "past", "recent", "recently", "since", "after", "before", "until", "till",
+                   "ago", "previous", "next", "this", "today", "yesterday", "tonight", "decade", "decades",
+                   "weekend", "weekends", "summer", "winter", "monsoon", "spring", "autumn"}
+
+
+def _find_all(pattern, text):
+    return [(m.start(), m.end(), m) for m in re.finditer(pattern, text)]
+
+
+def _attribute(words):
+    found = {a for a, vocab in ATTRIBUTE_WORDS.items() if words & set(vocab)}
+    return found.pop() if len(found) == 1 else None
+
+
+def parse_intent(question):
+    """
+    Map a simple question onto one analysis call.
+
+    Returns:
+        dict with function, attribute, statistic, n, period (text), code and
+        confidence, or None when the question is not confidently understood.
+    """
+    text = answer_cache.normalise_question(question)
+    text = re.sub(r"[,;:?!'\"()]", " ", text)
+    used = []       # spans of text the parser understood
+
+    def take(span):
+        used.append(span[:2])
+
+    # Dates and periods
+    year = month = day = None
+    year_range = None
+    iso = _find_all(r"\b((?:19|20)\d{2})-(\d{1,2})-(\d{1,2})\b", text)
+    if len(iso) > 1:
+        return None
+    if iso:
+        take(iso[0])
+        year, month, day = (int(g) for g in iso[0][2].groups())
+    else:
+        years = _find_all(r"\b(?:19|20)\d{2}\b", text)
+        for span in years:
+            take(span)
+        if len(years) == 2 and re.search(r"\b(?:between|from)\b.*\b(?:and|to)\b", text):
+            year_range = tuple(sorted(int(span[2].group()) for span in years))
+        elif len(years) == 1:
+            year = int(years[0][2].group())
+        elif years:
+            return None
+
+        months = _find_all(rf"\b(?:{MONTH_PATTERN})\b", text)
+        # "may" is usually a verb unless it sits next to a year, a day or "in"
+        months = [
+            span for span in months
+            if span[2].group() != "may"
+            or re.search(r"\b(?:in|of|during|for)\s+may\b|\bmay\s+\d|\d\s+may\b", text)
+        ]
+        if len(months) > 1:
+            return None
+        if months:
+            take(months[0])
+            month = semantic_cache.MONTH_NAMES.index(
+                next(m for m in semantic_cache.MONTH_NAMES if m.startswith(months[0][2].group()[:3]))
+            ) + 1
+            day_match = _find_all(
+                rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?={months[0][2].group()}\b)"
+                rf"|(?<={months[0][2].group()})\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?!\d)",
+                text,
+            )
+            if day_match:
+                take(day_match[0])
+                day = int(day_match[0][2].group(1) or day_match[0][2].group(2))
+
+    # Ranks and counts
+    n = None
+    ordinal = False
+    ranks = [(span, True, int(span[2].group(1))) for span in _find_all(r"\b(\d{1,3})(?:st|nd|rd|th)\b", text)]
+    ranks += [(span, True, ORDINAL_WORDS[span[2].group()])
+              for span in _find_all(rf"\b(?:{'|'.join(ORDINAL_WORDS)})\b", text)]
+    ranks += [(span, False, int(span[2].group())) for span in _find_all(r"\b\d{1,3}\b", text)]
+    ranks += [(span, False, COUNT_WORDS[span[2].group()])
+              for span in _find_all(rf"\b(?:{'|'.join(COUNT_WORDS)})\b", text)]
+    for span, is_ordinal, value in ranks:
+        if any(start <= span[0] < end for start, end in used):
+            continue
+        if n is not None:
+            return None
+        take(span)
+        n, ordinal = value, is_ordinal
+
+    # Remaining words: attribute, statistic, intent and filler
+    rest = text
+    for start, end in sorted(used, reverse=True):
+        rest = rest[:start] + " " + rest[end:]
+    words = set(re.findall(r"[a-z]+", rest))
+    if words & (BLOCK_WORDS | PERIOD_RANK_WORDS | QUALIFIER_WORDS):
+        return None
+
+    attribute = _attribute(words)
+    if attribute is None:
+        return None
+    directions = [d for d, vocab in semantic_cache.DIRECTION_WORDS.items() if semantic_cache._mentions(rest, vocab)]
+    statistics = [STATISTIC_DIRECTIONS[d] for d in directions if d in STATISTIC_DIRECTIONS]
+    if len(statistics) > 1:
+        return None
+    statistic = statistics[0] if statistics else None
+    wants_time = any(w in words for w in TIME_WORDS)
+
+    known = set(FILLER_WORDS) | set(TIME_WORDS) | set(RECORD_WORDS) | {"top", "bottom"}
+    for vocab in list(ATTRIBUTE_WORDS.values()) + list(semantic_cache.DIRECTION_WORDS.values()):
+        known.update(w for phrase in vocab for w in phrase.split())
+    unknown = [w for w in words if w not in known]
+    confidence = 1 - len(unknown) / max(len(words), 1)
+    if confidence < MIN_CONFIDENCE:
+        return None
+
+    if day is not None and month is None:
+        return None
+    collection_arg = ["collection"]
+    kwargs = {"year": year, "month": month, "day": day}
+
+    if "outlier" in directions:
+        if n is not None or statistic is not None:
+            return None
+        function, args = "detect_outliers", collection_arg + [attribute]
+    elif "trend" in directions or year_range is not None:
+        if year is not None or day is not None or n is not None:
+            return None
+        statistic = statistic or "mean"
+        if month is not None:
+            function, args = "get_monthly_trend", collection_arg + [attribute, month, statistic]
+        else:
+            function, args = "get_yearly_trend", collection_arg + [attribute, statistic]
+        kwargs = {"year_range": year_range}
+    elif statistic in ("max", "min") and n is not None and not ordinal:
+        if day is not None:
+            return None
+        function, args = "get_top_n", collection_arg + [attribute, n]
+        kwargs = {"year": year, "month": month, "ascending": statistic == "min"}
+    elif statistic in ("max", "min") and (ordinal or wants_time):
+        function = "get_nth_highest_value" if statistic == "max" else "get_nth_lowest_value"
+        args = collection_arg + [n or 1, attribute]
+    elif statistic is not None and n is None:
+        function, args = "get_statistic", [attribute, statistic]
+    else:
+        return None
+
+    kwargs = {k: v for k, v in kwargs.items() if v is not None and v is not False}
+    source_args = [a if a == "collection" else repr(a) for a in args]
+    source_args += [f"{k}={v!r}" for k, v in kwargs.items()]
+    return {
+        "function": function,
+        "attribute": attribute,
+        "statistic": statistic,
+        "n": n,
+        "period": describe_period(year, month, day, year_range),
+        "code": f"result = {function}({', '.join(source_args)})",
+        "confidence": round(confidence, 2),
+    }
+
+
+def describe_period(year=None, month=None, day=None, year_range=None):
+    if year_range:
+        return f"from {year_range[0]} to {year_range[1]}"
+    month_name = semantic_cache.MONTH_NAMES[month - 1].capitalize() if month else None
+    if day:
+        return f"on {day} {month_name} {year}" if year else f"on {day} {month_name} (all years)"
+    if month:
+        return f"in {month_name} {year}" if year else f"in {month_name} (all years)"
+    return f"in {year}" if year else "across all years"
+
+
+def _ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def describe_result(intent, result):
+    """
+    Plain-language answer for a fast-path result, in place of the summary call.
+    """
+    if isinstance(result, str):
+        return result
+    label = numeric_engine.LABELS[intent["attribute"]]
+    unit = numeric_engine.UNITS[intent["attribute"]]
+    function, period = intent["function"], intent["period"]
+
+    if function == "get_statistic":
+        return f"The {intent['statistic']} {label} {period} was {result}{unit}."
+    if function in ("get_nth_highest_value", "get_nth_lowest_value"):
+        if not result or result.get("value") is None:
+            return f"No data available for that {label} ranking {period}."
+        rank = "" if intent["n"] in (None, 1) else _ordinal(intent["n"]) + " "
+        direction = "highest" if function == "get_nth_highest_value" else "lowest"
+        return f"The {rank}{direction} {label} {period} was {result['value']}{unit}. {result['document']}"
+    if function == "get_top_n":
+        direction = "lowest" if intent["statistic"] == "min" else "highest"
+        lines = [f"The {intent['n']} {direction} hourly {label} readings {period}:"]
+        return "\n".join(lines + [f"- {doc}" for doc in result])
+    if function in ("get_yearly_trend", "get_monthly_trend"):
+        values = ", ".join(f"{year}: {value}{unit}" for year, value in result.items())
+        return f"{intent['statistic'].capitalize()} {label} by year {period}: {values}."
+    if function == "detect_outliers":
+        shown = "\n".join(f"- {o['document']}" for o in result[:10])
+        more = f"\n… and {len(result) - 10} more." if len(result) > 10 else ""
+        return f"Found {len(result)} outlier {label} readings {period}." + (f"\n{shown}{more}" if result else "")
+    return str(result)
@@ -1,4 +1,6 @@
+import sys
+
 from data_fetch_agent import fetch_all_years
 
 if __name__ == "__main__":
-    fetch_all_years()
+    fetch_all_years(incremental="--full" not in sys.argv)
@@ -0,0 +1,276 @@
+# In-memory numeric backend for dataanalysis.
+#
+# Answers the same questions as the Chroma-backed functions directly from the
+# hourly arrays in weather_store, so no documents are fetched or parsed.
+
+import heapq
+import threading
+
+import numpy as np
+
+import data_version
+import weather_store
+
+UNITS = {"temperature": "°C", "humidity": "%", "wind_speed": " m/s"}
+LABELS = {"temperature": "temperature", "humidity": "humidity", "wind_speed": "wind speed"}
+STATISTICS = ["mean", "median", "mode", "min", "max"]
+
+
+def format_value(value, integer=False):
+    # As embedding.py prints the source column: "43" when the year's column was
+    # all whole numbers (int64 in JSON), otherwise "43.0" / "12.2"
+    return str(int(value)) if integer else str(float(value))
+
+
+def hour_document(attribute, timestamp, value, integer=False):
+    """
+    Hourly sentence in the same form as the embedded hour records.
+    """
+    t_str = str(np.datetime64(int(timestamp), "s")).replace("T", " ")
+    return f"On {t_str} in Delhi, the {LABELS[attribute]} was {format_value(value, integer)}{UNITS[attribute]}."
+
+
+def compute_statistic(values, statistic):
+    """
+    mean / median / mode / min / max of a 1-D array, ignoring NaN.
+    Mode follows pandas: the smallest of the most frequent values.
+    """
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+    if statistic == "mean":
+        return float(values.mean())
+    if statistic == "median":
+        return float(np.median(values))
+    if statistic == "mode":
+        uniques, counts = np.unique(values, return_counts=True)
+        return float(uniques[np.argmax(counts)])
+    if statistic == "min":
+        return float(values.min())
+    if statistic == "max":
+        return float(values.max())
+    raise ValueError(f"Unknown statistic '{statistic}'. Use one of {STATISTICS}.")
+
+
+# Below this n a bounded heap beats converting a Python list to an array
+HEAP_SELECT_LIMIT = 64
+
+
+def select_top(values, n, largest=True):
+    """
+    Positions of the n largest (or smallest) values, best first, without sorting
+    everything. Equal values keep their original order, exactly like
+    sorted(..., reverse=largest)[:n] on a stable sort.
+
+    Parameters:
+        values: list or 1-D numpy array of floats (no NaN)
+        n: number of winners
+        largest: True for highest values, False for lowest
+
+    Returns:
+        List/array of positions into values.
+    """
+    if n <= 0:
+        return []
+    if not isinstance(values, np.ndarray) and n <= HEAP_SELECT_LIMIT:
+        pick = heapq.nlargest if largest else heapq.nsmallest
+        return pick(n, range(len(values)), key=values.__getitem__)
+
+    key = -np.asarray(values, dtype=np.float64) if largest else np.asarray(values, dtype=np.float64)
+    if n < key.size:
+        # Everything at or better than the n-th key, ties included, still in original order
+        kth = np.partition(key, n - 1)[n - 1]
+        candidates = np.flatnonzero(key <= kth)
+    else:
+        candidates = np.arange(key.size)
+    return candidates[np.argsort(key[candidates], kind="stable")][:n]
+
+
+class NumericEngine:
+    def __init__(self, series=None, data_dir=weather_store.DATA_DIR):
+        series = series if series is not None else weather_store.load_series(data_dir=data_dir)
+        self.time = np.asarray(series["time"], dtype=np.int64)
+        # float32 on disk -> float64 rounded back to the source's decimals
+        self.values = {
+            attr: np.asarray(series[attr], dtype=np.float64).round(2)
+            for attr in weather_store.ATTRIBUTES
+        }
+
+        stamps = self.time.astype("datetime64[s]")
+        days = stamps.astype("datetime64[D]")
+        months = stamps.astype("datetime64[M]")
+        self.year = months.astype("datetime64[Y]").astype(np.int64) + 1970
+        self.month = months.astype(np.int64) % 12 + 1
+        self.day = (days - months.astype("datetime64[D]")).astype(np.int64) + 1
+        self.hour = ((stamps - days.astype("datetime64[s]")).astype(np.int64) // 3600)
+
+        # Years whose column embedding.py saw as int64 (no NaN, all whole numbers)
+        self.integer_years = {}
+        for attr, values in self.values.items():
+            whole = np.isfinite(values) & (values == np.floor(values))
+            self.integer_years[attr] = {
+                int(year) for year in np.unique(self.year) if whole[self.year == year].all()
+            }
+
+    def __len__(self):
+        return len(self.time)
+
+    def _values(self, attribute):
+        try:
+            return self.values[attribute]
+        except KeyError:
+            raise ValueError(f"Unknown attribute '{attribute}'. Use one of {weather_store.ATTRIBUTES}.")
+
+    def select(self, attribute, year=None, month=None, day=None):
+        """
+        Row indices (in time order) of non-missing hours matching the filters.
+        """
+        values = self._values(attribute)
+        mask = ~np.isnan(values)
+        if year:
+            mask &= self.year == year
+        if month:
+            mask &= self.month == month
+        if day:
+            mask &= self.day == day
+        return np.flatnonzero(mask)
+
+    def metadata(self, i, attribute):
+        return {
+            "type": "hour_record",
+            "year": int(self.year[i]),
+            "month": int(self.month[i]),
+            "day": int(self.day[i]),
+            "hour": int(self.hour[i]),
+            "attribute": attribute,
+            "value": float(self.values[attribute][i]),
+        }
+
+    def document(self, i, attribute):
+        integer = int(self.year[i]) in self.integer_years[attribute]
+        return hour_document(attribute, self.time[i], self.values[attribute][i], integer)
+
+    def _top(self, attribute, n, year=None, month=None, day=None, ascending=False):
+        rows = self.select(attribute, year, month, day)
+        return rows[select_top(self.values[attribute][rows], n, largest=not ascending)]
+
+    # --- dataanalysis-compatible queries -------------------------------------------
+
+    def get_statistic(self, attribute, statistic, year=None, month=None, day=None):
+        rows = self.select(attribute, year, month, day)
+        value = compute_statistic(self.values[attribute][rows], statistic)
+        if value is None:
+            return "No data found."
+        return round(value, 2)
+
+    def get_nth_highest_value(self, n, attribute, year=None, month=None, day=None):
+        top = self._top(attribute, n, year, month, day)
+        if n < 1 or len(top) < n:
+            return {"value": None, "document": "No data available", "n": n}
+        i = top[n - 1]
+        return {"value": float(self.values[attribute][i]), "document": self.document(i, attribute), "n": n}
+
+    def get_nth_lowest_value(self, n, attribute="temperature", year=None, month=None, day=None):
+        top = self._top(attribute, n, year, month, day, ascending=True)
+        if n < 1 or len(top) < n:
+            return None
+        i = top[n - 1]
+        return {
+            "value": float(self.values[attribute][i]),
+            "document": self.document(i, attribute),
+            "metadata": self.metadata(i, attribute),
+        }
+
+    def get_statistic_with_time(self, attribute, statistic, year=None, month=None, day=None):
+        rows = self.select(attribute, year, month, day)
+        values = self.values[attribute][rows]
+        value = compute_statistic(values, statistic)
+        if value is None:
+            return {"value": None, "hours": "No summary data found."}
+        value = round(value, 2)
+
+        hits = rows[np.abs(values - value) < 0.01]
+        if hits.size == 0:
+            return {"value": value, "hours": "No exact hourly matches found (possible aggregation or missing data)."}
+        return {
+            "value": value,
+            "hours": [
+                {
+                    "text": self.document(i, attribute),
+                    "year": int(self.year[i]),
+                    "month": int(self.month[i]),
+                    "day": int(self.day[i]),
+                    "hour": int(self.hour[i]),
+                }
+                for i in hits
+            ],
+        }
+
+    def get_top_n(self, attribute, n, year=None, month=None, ascending=False):
+        top = self._top(attribute, n, year, month, ascending=ascending)
+        return [self.document(i, attribute) for i in top]
+
+    def _trend(self, attribute, statistic, month=None, year_range=None):
+        values = self._values(attribute)
+        trends = {}
+        for year in np.unique(self.year):
+            year = int(year)
+            if year_range and not (year_range[0] <= year <= year_range[1]):
+                continue
+            rows = self.select(attribute, year, month)
+            value = compute_statistic(values[rows], statistic)
+            if value is not None:
+                trends[year] = round(value, 2)
+        return trends
+
+    def get_yearly_trend(self, attribute, statistic="mean", year_range=None):
+        trends = self._trend(attribute, statistic, year_range=year_range)
+        return trends or "No data found for trend analysis."
+
+    def get_monthly_trend(self, attribute, month, statistic="mean", year_range=None):
+        trends = self._trend(attribute, statistic, month=month, year_range=year_range)
+        return trends or "No data found for monthly trend analysis in the specified years."
+
+    def detect_outliers(self, attribute="temperature", year=None, month=None, day=None):
+        rows = self.select(attribute, year, month, day)
+        if rows.size == 0:
+            return []
+        values = self.values[attribute][rows]
+        q1, q3 = np.quantile(values, [0.25, 0.75])
+        iqr = q3 - q1
+        hits = rows[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+        return [
+            {
+                "value": float(self.values[attribute][i]),
+                "document": self.document(i, attribute),
+                "metadata": self.metadata(i, attribute),
+            }
+            for i in hits
+        ]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+_engine_version = data_version.VersionCheck()
+
+
+def get_engine():
+    """
+    Process-wide NumericEngine, loaded on first use and reloaded when
+    data_version changes.
+    """
+    global _engine
+    if _engine is not None and _engine_version.stale():
+        reset_engine()
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine_version.mark()
+                _engine = NumericEngine()
+    return _engine
+
+
+def reset_engine():
+    global _engine
+    with _engine_lock:
+        _engine = None
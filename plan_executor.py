@@ -0,0 +1,235 @@
+# Parallel executor for Gemini's generated analysis code.
+#
+# The generated plan is usually a handful of top-level assignments such as
+#
+#   temp = get_yearly_trend("temperature", "mean")
+#   hum = get_yearly_trend("humidity", "mean")
+#   diff = {y: temp[y] - hum[y] for y in temp}
+#
+# Each top-level statement becomes a node of a dependency graph built from the
+# names it reads and writes. Assignments whose value is a single call to one of
+# the analysis functions run on a thread pool as soon as their inputs exist;
+# every other statement runs on the calling thread, in program order. Identical
+# calls (same function, same argument values) within one plan run once.
+#
+# The result is the same namespace a plain exec() would leave behind.
+
+import ast
+import builtins
+import copy
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+MAX_WORKERS = 8
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="plan")
+        return _pool
+
+
+class Node:
+    def __init__(self, index, stmt, call_names):
+        self.index = index
+        self.stmt = stmt
+        self.reads = set()
+        self.writes = set()
+        for node in ast.walk(stmt):
+            if isinstance(node, ast.Name):
+                (self.writes if isinstance(node.ctx, (ast.Store, ast.Del)) else self.reads).add(node.id)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.writes.add(node.name)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                self.writes.update((a.asname or a.name).split(".")[0] for a in node.names)
+        if isinstance(stmt, ast.AugAssign) and isinstance(stmt.target, ast.Name):
+            self.reads.add(stmt.target.id)
+        self.targets = _call_targets(stmt, call_names)
+        self.deps = set()
+
+    @property
+    def is_call(self):
+        return self.targets is not None
+
+    def touches(self):
+        return self.reads | self.writes
+
+
+def _target_names(target):
+    if isinstance(target, ast.Name):
+        return target.id
+    if isinstance(target, (ast.Tuple, ast.List)):
+        names = [_target_names(t) for t in target.elts]
+        return None if None in names else tuple(names)
+    return None
+
+
+def _call_targets(stmt, call_names):
+    """
+    Target names of `x = f(...)` / `a, b = f(...)` where f is an analysis
+    function and no argument calls another one; None for anything else.
+    """
+    if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.value, ast.Call)):
+        return None
+    call = stmt.value
+    if not (isinstance(call.func, ast.Name) and call.func.id in call_names):
+        return None
+    if any(isinstance(a, ast.Starred) for a in call.args) or any(k.arg is None for k in call.keywords):
+        return None
+    for arg in call.args + [k.value for k in call.keywords]:
+        if any(isinstance(n, (ast.Call, ast.NamedExpr, ast.Lambda, ast.Await, ast.Yield)) for n in ast.walk(arg)):
+            return None
+    return _target_names(stmt.targets[0])
+
+
+def build_graph(tree, call_names, shared_names=()):
+    """
+    Dependency edges between the top-level statements of a parsed plan.
+
+    Calls only read their arguments. Any other statement may mutate whatever it
+    touches, so it conflicts with every earlier and later node sharing a name,
+    and such statements keep their relative order (they may print).
+    shared_names (the analysis functions, collection, builtins) never conflict
+    unless the plan rebinds them.
+    """
+    nodes = [Node(i, stmt, call_names) for i, stmt in enumerate(tree.body)]
+    shared = (set(shared_names) | set(dir(builtins))) - set().union(*(n.writes for n in nodes))
+    for j, later in enumerate(nodes):
+        for earlier in nodes[:j]:
+            if not earlier.is_call and not later.is_call:
+                later.deps.add(earlier.index)
+                continue
+            modifies_earlier = earlier.writes if earlier.is_call else earlier.touches()
+            modifies_later = later.writes if later.is_call else later.touches()
+            if ((modifies_earlier & later.touches()) | (modifies_later & earlier.touches())) - shared:
+                later.deps.add(earlier.index)
+    return nodes
+
+
+def _freeze(value):
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple(sorted((repr(k), _freeze(v)) for k, v in value.items()))
+    return ("id", id(value))
+
+
+class CallRegistry:
+    """
+    Calls submitted so far, by (function, arguments). Shared between plans,
+    it lets a whole batch of plans run each distinct call once.
+    """
+
+    def __init__(self, pool=None):
+        self.pool = pool or get_pool()
+        self._futures = {}
+        self._delivered = set()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def submit(self, key, func, args, kwargs):
+        """
+        Returns:
+            (future, coalesced) where coalesced is True if the call was
+            already submitted.
+        """
+        with self._lock:
+            if key in self._futures:
+                self.stats["coalesced"] += 1
+                return self._futures[key], True
+            self.stats["calls"] += 1
+            future = self._futures[key] = self.pool.submit(func, *args, **kwargs)
+            return future, False
+
+    def claim(self, future):
+        """
+        True for the first consumer of a future's result; later consumers
+        must copy it, as separate calls would have returned separate objects.
+        """
+        with self._lock:
+            first = future not in self._delivered
+            self._delivered.add(future)
+            return first
+
+
+def _assign(targets, value, namespace):
+    if isinstance(targets, str):
+        namespace[targets] = value
+        return
+    values = list(value)
+    if len(values) != len(targets):
+        raise ValueError(f"cannot unpack {len(values)} values into {len(targets)} names")
+    for target, item in zip(targets, values):
+        _assign(target, item, namespace)
+
+
+def run_plan(code, globals_, namespace, call_names, pool=None, stats=None, registry=None):
+    """
+    Execute generated code like exec(code, globals_, namespace), running
+    independent analysis calls concurrently.
+
+    Parameters:
+        code: Python source produced by the model.
+        call_names: names of the analysis functions that may run in parallel.
+        stats: optional dict, receives calls / coalesced / statements counts.
+        registry: CallRegistry shared with other plans; a private one by default.
+
+    Returns:
+        namespace, after every statement has run.
+    """
+    tree = ast.parse(code)
+    nodes = build_graph(tree, call_names, shared_names=set(namespace))
+    private = registry is None
+    registry = registry or CallRegistry(pool)
+    stats = stats if stats is not None else {}
+    stats.update(calls=0, coalesced=0, statements=len(nodes))
+
+    done = set()
+    remaining = list(nodes)
+    running = {}        # future -> [nodes waiting on it]
+    try:
+        while remaining or running:
+            progressed = False
+            for node in list(remaining):
+                if not node.deps <= done:
+                    continue
+                remaining.remove(node)
+                progressed = True
+                if node.is_call:
+                    call = node.stmt.value
+                    func = eval(compile(ast.Expression(call.func), "<plan>", "eval"), globals_, namespace)
+                    args = [eval(compile(ast.Expression(a), "<plan>", "eval"), globals_, namespace) for a in call.args]
+                    kwargs = {
+                        k.arg: eval(compile(ast.Expression(k.value), "<plan>", "eval"), globals_, namespace)
+                        for k in call.keywords
+                    }
+                    key = (call.func.id, _freeze(args), _freeze(kwargs))
+                    future, coalesced = registry.submit(key, func, args, kwargs)
+                    stats["coalesced" if coalesced else "calls"] += 1
+                    running.setdefault(future, []).append(node)
+                else:
+                    module = ast.Module(body=[node.stmt], type_ignores=[])
+                    exec(compile(module, "<plan>", "exec"), globals_, namespace)
+                    done.add(node.index)
+            if progressed or not running:
+                continue
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                for node in running.pop(future):
+                    # coalesced callers get their own copy, as separate calls would
+                    _assign(node.targets, result if registry.claim(future) else copy.deepcopy(result), namespace)
+                    done.add(node.index)
+    finally:
+        # Only cancel calls no other plan is waiting on
+        if private:
+            for future in running:
+                future.cancel()
+    return namespace
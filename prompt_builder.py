@@ -0,0 +1,207 @@
+# System prompt for ask_ai, generated from the analysis functions themselves.
+#
+# Each allowed function is described once, from its signature and docstring in
+# dataanalysis.py, so the prompt cannot drift from the code. The static prompt
+# can also be stored server-side as a Gemini cached context and reused by
+# every chat session instead of being re-sent with each one.
+#
+#   python prompt_builder.py                 print the prompt
+#   python prompt_builder.py --measure       token counts / latency, legacy vs compact
+#
+# Set GEMINI_API_ENDPOINT to measure against a local stub server.
+
+import argparse
+import datetime
+import hashlib
+import inspect
+import threading
+import time
+
+HIDDEN_PARAMETERS = {"backend"}
+
+EXAMPLES = {
+    "get_statistic": 'result = get_statistic("temperature", "mean", year=2020, month=5)',
+    "get_nth_highest_value": 'result = get_nth_highest_value(collection, 5, "humidity", year=2018, month=7)',
+    "get_nth_lowest_value": 'result = get_nth_lowest_value(collection, 2, "wind_speed", year=2020)',
+    "get_yearly_trend": 'result = get_yearly_trend(collection, "temperature", "mean")',
+    "get_monthly_trend": 'result = get_monthly_trend(collection, "humidity", 6, "max", year_range=(2017, 2022))',
+    "get_top_n": 'result = get_top_n(collection, "temperature", n=5, year=2020, ascending=True)',
+    "detect_outliers": 'result = detect_outliers(collection, "temperature", year=2020)',
+    "get_range_statistic": 'result = get_range_statistic("temperature", "mean", days=30)',
+    "get_range_extreme": 'result = get_range_extreme("wind_speed", start="2023-06-10", end="2023-06-20")',
+    "get_extreme_window": 'result = get_extreme_window("temperature", 168, start="2023-05-01", end="2023-05-31", largest=False)',
+    "get_moving_statistic": 'result = get_moving_statistic("humidity", "mean", 168, start="2023-07-01", end="2023-07-31")',
+    "get_threshold_runs": 'runs = get_threshold_runs("temperature", 40, n=1)\n  result = runs[0] if runs else "No run above 40°C."',
+    "get_degree_hours": 'result = get_degree_hours("temperature", 24, start="2019-01-01", end="2019-12-31")',
+}
+
+DATASET = """You are a data analysis agent for hourly Delhi weather data (2015 onwards) stored in ChromaDB as `collection`.
+
+Records: hourly values ("On 2018-03-05 14:00:00 in Delhi, the temperature was 28.5°C.") and day, month and year summaries ("In April 2018 in Delhi, the maximum humidity was 45.00%.").
+Attributes: "temperature" (°C), "humidity" (%), "wind_speed" (m/s). Statistics: "mean", "median", "mode", "min", "max".
+Metadata: type ("hour_record", "day_summary", "month_summary", "year_summary"), year, month, day, hour, attribute, statistic (summaries only), value (float)."""
+
+RULES = """Rules:
+- Reply with raw executable Python only: no markdown, no explanations.
+- Use the functions above; do not query ChromaDB directly.
+- Always assign the answer to `result`. When several calls are needed, store each in its own variable, then combine them.
+- year, month and day filters are optional and can be combined; omitting them means all data.
+- For date ranges that are not a whole calendar year, month or day ("last 30 days", "10 to 20 June", "coolest week of May") use the get_range_* / get_extreme_window functions.
+- For consecutive hours or days (streaks, heatwaves, cold spells), moving averages and degree-hours use get_threshold_runs, get_moving_statistic and get_degree_hours; never loop over records. get_threshold_runs returns a list that is empty when no run exists, so never index it unchecked.
+- get_nth_highest_value / get_nth_lowest_value return a dict; use result["value"] for the number. Its "document" already holds the timestamp, so prefer these for "when" questions and never look the time up again.
+- For open questions ("tell me something interesting"), combine a few statistics into insights."""
+
+
+def docstring_sections(func):
+    """
+    (summary, returns): the docstring's first paragraph and its Returns:
+    section, each joined into one line.
+    """
+    doc = inspect.getdoc(func) or ""
+    paragraphs = [p.strip() for p in doc.split("\n\n") if p.strip()]
+    summary = " ".join(paragraphs[0].split()) if paragraphs else ""
+    returns = ""
+    for paragraph in paragraphs:
+        if paragraph.startswith("Returns:"):
+            returns = " ".join(paragraph[len("Returns:"):].split())
+    return summary, returns
+
+
+def describe_function(name, func):
+    """
+    One compact entry: signature, purpose, return value and an example call.
+    """
+    signature = inspect.signature(func)
+    params = [p for p in signature.parameters.values() if p.name not in HIDDEN_PARAMETERS]
+    summary, returns = docstring_sections(func)
+    line = f"- {name}{signature.replace(parameters=params)}"
+    if summary:
+        line += f": {summary}"
+    if returns:
+        line += f" Returns: {returns}"
+    if name in EXAMPLES:
+        line += f"\n  e.g. {EXAMPLES[name]}"
+    return line
+
+
+def build_system_prompt(funcs):
+    """
+    Compact system prompt describing each function in {name: function} once.
+    """
+    functions = "\n".join(describe_function(name, func) for name, func in funcs.items())
+    return f"{DATASET}\n\nFunctions (`collection` is already defined):\n{functions}\n\n{RULES}\n"
+
+
+# ---------------------------------------------------------------------------
+# Context caching
+
+CONTEXT_TTL = datetime.timedelta(hours=1)
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+_contexts = {}      # (model, prompt hash) -> CachedContent, or None if refused
+_contexts_lock = threading.Lock()
+
+
+def _expired(context, margin=datetime.timedelta(0)):
+    return context.expire_time - datetime.datetime.now(datetime.timezone.utc) <= margin
+
+
+def cached_context(model_name, system_instruction, ttl=CONTEXT_TTL):
+    """
+    Server-side cached context holding the system prompt, shared by every chat
+    session. Created on first use, and again once the previous one has expired
+    or could not be extended (see keep_alive).
+
+    Returns:
+        CachedContent, or None when the backend refuses it (model without
+        context caching, prompt under the minimum cacheable size, ...).
+    """
+    from google.generativeai import caching
+
+    key = (model_name, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+    with _contexts_lock:
+        context = _contexts.get(key)
+        if key not in _contexts or (context is not None and _expired(context)):
+            try:
+                _contexts[key] = caching.CachedContent.create(
+                    model=model_name, system_instruction=system_instruction, ttl=ttl
+                )
+            except Exception as e:
+                print(f"⚠️ Context caching unavailable ({e}); the prompt is sent with each session.")
+                _contexts[key] = None
+        return _contexts[key]
+
+
+def keep_alive(margin=REFRESH_MARGIN, ttl=CONTEXT_TTL):
+    """
+    Extend cached contexts that expire within margin. Cheap to call per question.
+    A context that has already expired, or cannot be extended, is dropped so the
+    next cached_context call creates a fresh one.
+    """
+    with _contexts_lock:
+        for key, context in list(_contexts.items()):
+            if context is None or not _expired(context, margin):
+                continue
+            try:
+                if _expired(context):
+                    raise RuntimeError("already expired")
+                context.update(ttl=ttl)
+            except Exception as e:
+                print(f"⚠️ Could not extend cached context {context.name} ({e}); it will be recreated.")
+                del _contexts[key]
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+
+def measure(models, question, rounds=5):
+    """
+    Start a fresh chat session and ask question rounds times per model.
+
+    Parameters:
+        models: {label: GenerativeModel}
+
+    Returns:
+        {label: {"prompt_tokens", "cached_tokens", "latency_ms"}} with token
+        counts from the last response's usage metadata and the median latency.
+    """
+    report = {}
+    for label, model in models.items():
+        latencies = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            response = model.start_chat(history=[]).send_message(question)
+            latencies.append((time.perf_counter() - start) * 1000)
+        usage = response.usage_metadata
+        report[label] = {
+            "prompt_tokens": usage.prompt_token_count,
+            "cached_tokens": usage.cached_content_token_count,
+            "latency_ms": round(sorted(latencies)[len(latencies) // 2], 1),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or measure the ask_ai system prompt.")
+    parser.add_argument("--measure", action="store_true", help="compare legacy and compact prompts")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--question", default="highest temperature in 2018")
+    args = parser.parse_args()
+
+    import ask_ai
+    import google.generativeai as genai
+
+    if not args.measure:
+        print(ask_ai.system_prompt)
+    else:
+        ask_ai.configure_gemini()
+        models = {
+            "legacy": genai.GenerativeModel(ask_ai.GEMINI_MODEL, system_instruction=ask_ai.legacy_system_prompt),
+            "compact": genai.GenerativeModel(ask_ai.GEMINI_MODEL, system_instruction=ask_ai.system_prompt),
+        }
+        context = cached_context(ask_ai.GEMINI_MODEL, ask_ai.system_prompt)
+        if context is not None:
+            models["compact+cache"] = genai.GenerativeModel.from_cached_content(context)
+        for label, row in measure(models, args.question, args.rounds).items():
+            print(f"📏 {label:14} prompt tokens {row['prompt_tokens']:6}  "
+                  f"cached {row['cached_tokens']:6}  median latency {row['latency_ms']} ms")
@@ -0,0 +1,258 @@
+# Resident Q&A service.
+#
+# Loads the Chroma collection, the analysis functions and the Gemini client once,
+# then answers many questions concurrently, either over HTTP or as JSON lines on
+# stdin/stdout:
+#
+#   python qa_service.py --http 8080        POST /ask {"question": "..."}
+#   python qa_service.py --stdin            {"id": 1, "question": "..."} per line
+#   POST /ask/stream, or "stream": true     JSON-lines events: code, partial variables,
+#                                           summary tokens, then the full answer
+#   GET /stats                              answer / semantic cache hit and miss counts
+#   python qa_service.py --http 8080 --tools    answer via native function calls
+#
+# Set GEMINI_API_ENDPOINT to point the client at a local stub server in tests.
+
+import argparse
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import answer_cache
+import ask_ai
+import data_access
+import sandbox_executor
+import scan_cache
+import semantic_cache
+
+
+def to_jsonable(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+class QAService:
+    def __init__(self, model=None, workers=8, use_cache=True, use_semantic_cache=True, use_tools=False,
+                 use_fast_path=True, sandbox_workers=0, timeout=sandbox_executor.DEFAULT_TIMEOUT,
+                 memory_mb=sandbox_executor.DEFAULT_MEMORY_MB, warm=True):
+        if warm:
+            # Pay for opening Chroma and the aggregate index before the first request
+            print("✅ Warmed up:", data_access.warm_up())
+        if model is None:
+            ask_ai.configure_gemini()
+            # The code model stays None and is built per request, so an expired
+            # cached context is recreated instead of failing every later question
+            model = ask_ai.build_tool_model() if use_tools else None
+        self.model = model
+        self.use_tools = use_tools
+        self.use_fast_path = use_fast_path
+        # Generated code runs in worker processes, so a runaway plan cannot stall the service
+        self.sandbox = None
+        if sandbox_workers:
+            self.sandbox = sandbox_executor.SandboxPool(sandbox_workers, timeout=timeout, memory_mb=memory_mb)
+            ask_ai.use_sandbox(self.sandbox)
+        self.cache = answer_cache.get_cache() if use_cache else None
+        self.semantic = semantic_cache.get_cache() if use_semantic_cache else None
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def ask(self, question):
+        """
+        Answer one question (blocking). Safe to call from many threads.
+        """
+        try:
+            if self.use_tools:
+                return to_jsonable(ask_ai.answer_question_with_tools(self.model, question))
+            return to_jsonable(ask_ai.answer_question(self.model, question, cache=self.cache,
+                                                         semantic=self.semantic, fast_path=self.use_fast_path))
+        except Exception as e:
+            return {"question": question, "error": str(e)}
+
+    def stream(self, question):
+        """
+        Answer one question as a sequence of JSON-ready events (see
+        ask_ai.stream_answer); the last one is always {"event": "done", ...}.
+        """
+        if self.use_tools:
+            yield {"event": "done", "answer": self.ask(question)}
+            return
+        try:
+            for event in ask_ai.stream_answer(self.model, question, cache=self.cache, semantic=self.semantic,
+                                              fast_path=self.use_fast_path):
+                yield to_jsonable(event)
+        except Exception as e:
+            yield {"event": "done", "answer": {"question": question, "error": str(e)}}
+
+    def stats(self):
+        stats = {}
+        if self.cache:
+            stats["answer_cache"] = dict(self.cache.stats)
+        if self.semantic:
+            stats["semantic_cache"] = dict(self.semantic.stats, hit_rate=round(self.semantic.hit_rate(), 4))
+        stats["scan_cache"] = scan_cache.get_cache().info()
+        if self.sandbox:
+            stats["sandbox"] = dict(self.sandbox.stats)
+        return stats
+
+    def submit(self, question):
+        return self.pool.submit(self.ask, question)
+
+    def submit_stream(self, question, emit):
+        """
+        Stream one question on the pool, calling emit(event) for each event.
+        """
+        def run():
+            for event in self.stream(question):
+                emit(event)
+        return self.pool.submit(run)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        if self.sandbox:
+            ask_ai.use_sandbox(None)
+            self.sandbox.close()
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._send(200, service.stats())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def _stream(self, question):
+            # No Content-Length: the body is one JSON event per line until close
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for event in service.stream(question):
+                self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+        def do_POST(self):
+            if self.path not in ("/ask", "/ask/stream"):
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send(400, {"error": "body must be JSON"})
+                return
+            if not isinstance(request, dict):
+                self._send(400, {"error": "body must be a JSON object"})
+                return
+            question = request.get("question")
+            if not isinstance(question, str) or not question.strip():
+                self._send(400, {"error": "missing 'question'"})
+                return
+            if self.path == "/ask/stream":
+                self._stream(question)
+            else:
+                self._send(200, service.ask(question))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve_http(service, host="127.0.0.1", port=8080):
+    # ThreadingHTTPServer already answers each request on its own thread
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"✅ Q&A service listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def serve_stdin(service, stdin=sys.stdin, stdout=sys.stdout):
+    """
+    One JSON request per input line; answers are written as they complete,
+    tagged with the request's id. Requests with "stream": true get one line
+    per event instead. Blank lines are skipped; a request without a question
+    gets an error line instead of an answer.
+    """
+    write_lock = threading.Lock()
+
+    def emit(request_id, event):
+        event["id"] = request_id
+        with write_lock:
+            stdout.write(json.dumps(event) + "\n")
+            stdout.flush()
+
+    def write(request_id, future):
+        answer = future.result()
+        answer["id"] = request_id
+        with write_lock:
+            stdout.write(json.dumps(answer) + "\n")
+            stdout.flush()
+
+    futures = []
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = {"question": line}
+        if not isinstance(request, dict) or not isinstance(request.get("question", ""), str):
+            emit(None, {"error": "each line must be a JSON object with a string 'question', or plain text"})
+            continue
+        question = request.get("question", "").strip()
+        if not question:
+            emit(request.get("id"), {"error": "missing 'question'"})
+            continue
+        if request.get("stream"):
+            future = service.submit_stream(question, lambda event, request_id=request.get("id"): emit(request_id, event))
+        else:
+            future = service.submit(question)
+            future.add_done_callback(lambda f, request_id=request.get("id"): write(request_id, f))
+        futures.append(future)
+    for future in futures:
+        future.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-running Delhi weather Q&A service.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--http", type=int, metavar="PORT", help="serve POST /ask on this port")
+    mode.add_argument("--stdin", action="store_true", help="read JSON-lines questions from stdin")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--workers", type=int, default=8, help="questions answered concurrently")
+    parser.add_argument("--no-cache", action="store_true", help="always ask the model")
+    parser.add_argument("--no-semantic-cache", action="store_true", help="only reuse answers to identical questions")
+    parser.add_argument("--tools", action="store_true", help="native function calling instead of generated code")
+    parser.add_argument("--no-fast-path", action="store_true", help="send every question to the model")
+    parser.add_argument("--sandbox", type=int, default=0, metavar="N",
+                        help="run generated code in N pre-warmed worker processes")
+    parser.add_argument("--timeout", type=float, default=sandbox_executor.DEFAULT_TIMEOUT,
+                        help="seconds a sandboxed plan may run")
+    parser.add_argument("--memory-mb", type=int, default=sandbox_executor.DEFAULT_MEMORY_MB,
+                        help="extra memory a sandboxed plan may allocate")
+    args = parser.parse_args()
+
+    service = QAService(workers=args.workers, use_cache=not args.no_cache,
+                        use_semantic_cache=not args.no_cache and not args.no_semantic_cache,
+                        use_tools=args.tools, use_fast_path=not args.no_fast_path,
+                        sandbox_workers=args.sandbox, timeout=args.timeout, memory_mb=args.memory_mb)
+    try:
+        if args.http is not None:
+            serve_http(service, args.host, args.http)
+        else:
+            serve_stdin(service)
+    finally:
+        service.close()
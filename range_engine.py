@@ -0,0 +1,310 @@
+# Arbitrary date-range statistics over the hourly series.
+#
+# dataanalysis can only scope by calendar year/month/day. RangeIndex answers
+# any [start, end) window over one attribute without scanning it:
+#
+#   count / mean   prefix sums                              O(log n) (bisect the window)
+#   min / max      sparse tables of argmin / argmax         O(log n), with the hour it happened
+#   median         wavelet matrix over value ranks          O(log n + log σ)
+#   mode           counted over the window slice            O(window), no index
+#
+# Windows are located by binary search on the sorted timestamps. Sliding-window
+# extremes ("coolest week of May") evaluate every hourly window start at once
+# from the prefix sums.
+
+import datetime
+import threading
+
+import numpy as np
+
+import numeric_engine
+import weather_store
+
+SECONDS_PER_DAY = 86400
+# Stored hours are naive Delhi wall-clock times (the archive is fetched with
+# timezone=Asia/Kolkata, which has had no DST since 1945)
+DATA_TIMEZONE = datetime.timezone(datetime.timedelta(hours=5, minutes=30), "Asia/Kolkata")
+
+
+def to_seconds(value, end=False):
+    """
+    Epoch seconds for a window bound.
+
+    Dates ("2023-06-20", datetime.date) cover the whole day, so as an end bound
+    they mean the following midnight. Datetimes ("2023-06-20 14:00") are exact;
+    as an end bound the given hour itself is included. Naive datetimes are Delhi
+    time; timezone-aware ones are converted to it.
+    """
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip().replace("T", " ")
+        value = datetime.datetime.fromisoformat(text) if (" " in text or ":" in text) else datetime.date.fromisoformat(text)
+    if isinstance(value, np.datetime64):
+        seconds = int(value.astype("datetime64[s]").astype(np.int64))
+        return seconds + 1 if end else seconds
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(DATA_TIMEZONE).replace(tzinfo=None)
+        seconds = int((value - datetime.datetime(1970, 1, 1)).total_seconds())
+        return seconds + 1 if end else seconds
+    if isinstance(value, datetime.date):
+        seconds = (value - datetime.date(1970, 1, 1)).days * SECONDS_PER_DAY
+        return seconds + SECONDS_PER_DAY if end else seconds
+    raise ValueError(f"Cannot interpret {value!r} as a date or datetime.")
+
+
+def window_hours(hours):
+    """
+    Window length as a positive whole number of hours.
+    """
+    if isinstance(hours, bool) or int(hours) != hours or hours < 1:
+        raise ValueError(f"Window length must be a whole number of hours >= 1, got {hours!r}.")
+    return int(hours)
+
+
+class SparseTable:
+    """
+    Position of the minimum (or maximum) of any range in O(1) after an
+    O(n log n) build. Ties resolve to the earliest position.
+    """
+
+    def __init__(self, values, largest=False):
+        self.values = values
+        self.largest = largest
+        n = len(values)
+        level = np.arange(n, dtype=np.int32)
+        self.levels = [level]
+        width = 1
+        while 2 * width <= n:
+            left, right = level[:-width], level[width:]
+            a, b = values[left], values[right]
+            right_wins = b > a if largest else b < a
+            level = np.where(right_wins, right, left).astype(np.int32)
+            self.levels.append(level)
+            width *= 2
+
+    def query(self, lo, hi):
+        """
+        Position of the extreme of values[lo:hi] (hi > lo).
+        """
+        k = (hi - lo).bit_length() - 1
+        left, right = self.levels[k][lo], self.levels[k][hi - (1 << k)]
+        a, b = self.values[left], self.values[right]
+        return int(right if (b > a if self.largest else b < a) else left)
+
+    def query_many(self, lo, hi):
+        """
+        Vectorised query: positions of the extremes of values[lo[i]:hi[i]].
+        """
+        lo, hi = np.asarray(lo, np.int64), np.asarray(hi, np.int64)
+        k = np.floor(np.log2(np.maximum(hi - lo, 1))).astype(np.int64)
+        left = np.empty(len(lo), np.int64)
+        right = np.empty(len(lo), np.int64)
+        for level in np.unique(k):
+            rows = np.flatnonzero(k == level)
+            left[rows] = self.levels[level][lo[rows]]
+            right[rows] = self.levels[level][hi[rows] - (1 << int(level))]
+        a, b = self.values[left], self.values[right]
+        return np.where(b > a if self.largest else b < a, right, left)
+
+
+class WaveletMatrix:
+    """
+    k-th smallest value of any range in O(log σ), σ = number of distinct values.
+    """
+
+    def __init__(self, values):
+        self.alphabet, codes = np.unique(values, return_inverse=True)
+        self.bits = max(1, int(len(self.alphabet) - 1).bit_length())
+        self.zero_ranks = []    # per level: zeros among the first i entries
+        self.zero_totals = []
+        codes = codes.astype(np.int64)
+        for level in range(self.bits - 1, -1, -1):
+            bit = (codes >> level) & 1
+            zeros = np.concatenate(([0], np.cumsum(bit == 0)))
+            self.zero_ranks.append(zeros)
+            self.zero_totals.append(int(zeros[-1]))
+            codes = np.concatenate((codes[bit == 0], codes[bit == 1]))
+
+    def kth_smallest(self, lo, hi, k):
+        """
+        k-th smallest (0-based) of the original values[lo:hi].
+        """
+        code = 0
+        for zeros, total in zip(self.zero_ranks, self.zero_totals):
+            z_lo, z_hi = int(zeros[lo]), int(zeros[hi])
+            if k < z_hi - z_lo:
+                lo, hi = z_lo, z_hi
+                code <<= 1
+            else:
+                k -= z_hi - z_lo
+                lo, hi = total + (lo - z_lo), total + (hi - z_hi)
+                code = (code << 1) | 1
+        return float(self.alphabet[code])
+
+
+class RangeIndex:
+    """
+    Range structures for one attribute's non-missing hours, in time order.
+    """
+
+    def __init__(self, times, values, rows):
+        self.times = times
+        self.values = values
+        self.rows = rows    # positions in the NumericEngine arrays
+        self.prefix = np.concatenate(([0.0], np.cumsum(values)))
+        self.minimum = SparseTable(values, largest=False)
+        self.maximum = SparseTable(values, largest=True)
+        self.ranks = WaveletMatrix(values)
+
+    def bounds(self, start, end):
+        """
+        Index range [lo, hi) of the hours in [start, end) (epoch seconds).
+        """
+        return int(np.searchsorted(self.times, start, "left")), int(np.searchsorted(self.times, end, "left"))
+
+    def statistic(self, statistic, lo, hi):
+        if hi <= lo:
+            return None
+        if statistic == "count":
+            return hi - lo
+        if statistic == "mean":
+            return float((self.prefix[hi] - self.prefix[lo]) / (hi - lo))
+        if statistic == "min":
+            return float(self.values[self.minimum.query(lo, hi)])
+        if statistic == "max":
+            return float(self.values[self.maximum.query(lo, hi)])
+        if statistic == "median":
+            n = hi - lo
+            low = self.ranks.kth_smallest(lo, hi, (n - 1) // 2)
+            high = low if n % 2 else self.ranks.kth_smallest(lo, hi, n // 2)
+            return (low + high) / 2
+        if statistic == "mode":
+            return numeric_engine.compute_statistic(self.values[lo:hi], "mode")
+        raise ValueError(f"Unknown statistic '{statistic}'. Use one of {numeric_engine.STATISTICS + ['count']}.")
+
+    def extreme(self, lo, hi, largest=True):
+        """
+        Position (into this index) of the max (or min) of [lo, hi), or None.
+        """
+        if hi <= lo:
+            return None
+        return (self.maximum if largest else self.minimum).query(lo, hi)
+
+    def window_means(self, lo, hi, window):
+        """
+        (start positions, end positions, means) of every window of `window`
+        seconds that starts at an hour in [lo, hi) and fits before times[hi - 1].
+        """
+        if hi <= lo:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+        starts = np.arange(lo, hi)
+        last = self.times[hi - 1]
+        starts = starts[self.times[starts] + window <= last + 3600]
+        ends = np.minimum(np.searchsorted(self.times, self.times[starts] + window, "left"), hi)
+        counts = ends - starts
+        keep = counts > 0
+        starts, ends, counts = starts[keep], ends[keep], counts[keep]
+        return starts, ends, (self.prefix[ends] - self.prefix[starts]) / counts
+
+
+class RangeEngine:
+    def __init__(self, engine=None):
+        self.engine = engine or numeric_engine.get_engine()
+        order = np.argsort(self.engine.time, kind="stable")
+        self._order = order
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, attribute):
+        """
+        RangeIndex for an attribute, built on first use.
+        """
+        if attribute not in weather_store.ATTRIBUTES:
+            raise ValueError(f"Unknown attribute '{attribute}'. Use one of {weather_store.ATTRIBUTES}.")
+        if attribute not in self._indexes:
+            with self._lock:
+                if attribute not in self._indexes:
+                    values = self.engine.values[attribute][self._order]
+                    valid = ~np.isnan(values)
+                    rows = self._order[valid]
+                    self._indexes[attribute] = RangeIndex(self.engine.time[rows], values[valid], rows)
+        return self._indexes[attribute]
+
+    def window(self, attribute, start=None, end=None, days=None):
+        """
+        (index, lo, hi) for a window. start/end default to the first/last hour
+        on record; days alone means the last `days` days before end.
+        """
+        index = self.index(attribute)
+        if not len(index.times):
+            return index, 0, 0
+        end_s = to_seconds(end, end=True) if end is not None else int(index.times[-1]) + 1
+        if start is not None:
+            start_s = to_seconds(start)
+        elif days is not None:
+            start_s = end_s - int(days) * SECONDS_PER_DAY
+        else:
+            start_s = int(index.times[0])
+        lo, hi = index.bounds(start_s, end_s)
+        return index, lo, hi
+
+    def describe(self, index, position, attribute):
+        row = int(index.rows[position])
+        return {
+            "value": float(index.values[position]),
+            "document": self.engine.document(row, attribute),
+            "metadata": self.engine.metadata(row, attribute),
+        }
+
+    def statistic(self, attribute, statistic, start=None, end=None, days=None):
+        index, lo, hi = self.window(attribute, start, end, days)
+        return index.statistic(statistic, lo, hi)
+
+    def extreme(self, attribute, start=None, end=None, days=None, largest=True):
+        index, lo, hi = self.window(attribute, start, end, days)
+        position = index.extreme(lo, hi, largest)
+        return None if position is None else self.describe(index, position, attribute)
+
+    def extreme_window(self, attribute, hours, start=None, end=None, largest=True):
+        """
+        The `hours`-long window with the highest (or lowest) mean inside [start, end).
+        """
+        hours = window_hours(hours)
+        index, lo, hi = self.window(attribute, start, end)
+        starts, ends, means = index.window_means(lo, hi, hours * 3600)
+        if not len(means):
+            return None
+        best = int(np.argmax(means) if largest else np.argmin(means))
+        first, last = int(starts[best]), int(ends[best]) - 1
+        return {
+            "mean": float(means[best]),
+            "start": str(np.datetime64(int(index.times[first]), "s")).replace("T", " "),
+            "end": str(np.datetime64(int(index.times[last]), "s")).replace("T", " "),
+            "hours": last - first + 1,
+        }
+
+
+_range_engine = None
+_range_engine_lock = threading.Lock()
+
+
+def get_range_engine():
+    """
+    Process-wide RangeEngine over the shared NumericEngine, built on first use
+    and rebuilt when the NumericEngine is reloaded (see data_version).
+    """
+    global _range_engine
+    engine = numeric_engine.get_engine()
+    if _range_engine is None or _range_engine.engine is not engine:
+        with _range_engine_lock:
+            if _range_engine is None or _range_engine.engine is not engine:
+                _range_engine = RangeEngine(engine)
+    return _range_engine
+
+
+def reset_range_engine():
+    global _range_engine
+    with _range_engine_lock:
+        _range_engine = None
@@ -0,0 +1,118 @@
+# Rolling-window and run-length analytics over the hourly series.
+#
+# Questions about consecutive hours or days ("longest stretch above 40°C",
+# "7-day moving average of humidity in July", "cooling degree-hours in 2019")
+# are answered with whole-array numpy operations on the range_engine indexes
+# instead of loops over collection.get results:
+#
+#   moving_statistic   trailing window mean (prefix sums) or min/max (sparse
+#                      tables), one value per day
+#   threshold_runs     runs of consecutive hours (or days) beyond a threshold
+#   degree_hours       accumulated excess over (or shortfall under) a base
+#
+# A missing hour breaks a run: only hours exactly one hour apart are consecutive.
+
+import numpy as np
+
+import range_engine
+
+HOUR = 3600
+MOVING_STATISTICS = ("mean", "min", "max")
+
+
+def _stamp(seconds, unit="s"):
+    return str(np.datetime64(int(seconds), "s").astype(f"datetime64[{unit}]")).replace("T", " ")
+
+
+def moving_statistic(engine, attribute, statistic, hours, start=None, end=None):
+    """
+    {day: value} of the trailing `hours`-long window ending at each day's last
+    recorded hour in [start, end). Windows may reach back before start.
+    """
+    if statistic not in MOVING_STATISTICS:
+        raise ValueError(f"Moving statistic must be one of {MOVING_STATISTICS}, got '{statistic}'.")
+    hours = range_engine.window_hours(hours)
+    index, lo, hi = engine.window(attribute, start, end)
+    if hi <= lo:
+        return {}
+    times = index.times
+    days = times[lo:hi] // range_engine.SECONDS_PER_DAY
+    # Last position of each day in the range
+    last = lo + np.flatnonzero(np.r_[days[1:] != days[:-1], True])
+    ends = last + 1
+    starts = np.searchsorted(times, times[last] + HOUR - hours * HOUR, "left")
+    if statistic == "mean":
+        values = (index.prefix[ends] - index.prefix[starts]) / (ends - starts)
+    else:
+        table = index.maximum if statistic == "max" else index.minimum
+        values = index.values[table.query_many(starts, ends)]
+    return {_stamp(t, "D"): round(float(v), 2) for t, v in zip(times[last], values)}
+
+
+def _runs(keys, hit, step, peaks, peak):
+    """
+    (first, last, peak) for each run of consecutive hits, where consecutive
+    means keys exactly `step` apart; first/last are positions in keys.
+    """
+    positions = np.flatnonzero(hit)
+    if not len(positions):
+        return positions, positions, peaks[:0]
+    new = np.ones(len(positions), dtype=bool)
+    new[1:] = np.diff(keys[positions]) != step
+    first = positions[new]
+    last = positions[np.r_[new[1:], True]]
+    return first, last, peak.reduceat(peaks[positions], np.flatnonzero(new))
+
+
+def threshold_runs(engine, attribute, threshold, above=True, start=None, end=None, daily=False, n=5):
+    """
+    The n longest runs of consecutive hours (or days, with daily) above (or
+    below) threshold, longest first; equal lengths keep time order.
+    """
+    if isinstance(n, bool) or int(n) != n or n < 1:
+        raise ValueError(f"Number of runs must be a whole number >= 1, got {n!r}.")
+    index, lo, hi = engine.window(attribute, start, end)
+    times, values = index.times[lo:hi], index.values[lo:hi]
+    hit = values > threshold if above else values < threshold
+    peak = np.maximum if above else np.minimum
+    if daily:
+        # A day qualifies when any hour does, i.e. its max (min) crosses threshold
+        days = times // range_engine.SECONDS_PER_DAY
+        if not len(days):
+            return []
+        bounds = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        keys, step = days[bounds], 1
+        hit = np.logical_or.reduceat(hit, bounds)
+        peaks = peak.reduceat(values, bounds)
+        stamps, unit = keys * range_engine.SECONDS_PER_DAY, "D"
+    else:
+        keys, step, peaks, stamps, unit = times, HOUR, values, times, "m"
+
+    first, last, run_peaks = _runs(keys, hit, step, peaks, peak)
+    lengths = last - first + 1
+    order = np.argsort(-lengths, kind="stable")[:int(n)]
+    return [
+        {
+            "start": _stamp(stamps[first[i]], unit),
+            "end": _stamp(stamps[last[i]], unit),
+            ("days" if daily else "hours"): int(lengths[i]),
+            "peak": round(float(run_peaks[i]), 2),
+        }
+        for i in order
+    ]
+
+
+def degree_hours(engine, attribute, base, above=True, start=None, end=None):
+    """
+    Sum over the hours in [start, end) of the amount by which the value
+    exceeds (or, with above=False, falls short of) base.
+    """
+    index, lo, hi = engine.window(attribute, start, end)
+    values = index.values[lo:hi]
+    excess = values - base if above else base - values
+    excess = excess[excess > 0]
+    return {
+        "degree_hours": round(float(excess.sum()), 2),
+        "hours": int(len(excess)),
+        "total_hours": int(hi - lo),
+    }
@@ -0,0 +1,244 @@
+# Process-pool sandbox for Gemini's generated analysis code.
+#
+# Generated plans run in separate, pre-warmed worker processes instead of the
+# caller's interpreter. Each worker imports ask_ai once (Chroma collection,
+# aggregate index and numeric engine loaded up front) and then executes plans
+# sent over a pipe. Per job:
+#
+#   timeout   the worker is killed and replaced when a plan runs too long
+#   memory    RLIMIT_AS caps each worker's address space at its warmed-up size
+#             plus memory_mb. The cap is per worker, so memory a job leaves
+#             behind counts against the next one: a worker is replaced after a
+#             MemoryError, or when a job leaves it more than RECYCLE_FRACTION
+#             of memory_mb above its warmed-up size
+#   cancel    cancelling a running job's future kills its worker
+#
+# A runaway snippet therefore costs one worker restart, never the service.
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MEMORY_MB = 2048
+POLL_INTERVAL = 0.05
+START_TIMEOUT = 120.0
+RECYCLE_FRACTION = 0.5
+
+
+def _address_space():
+    try:
+        with open("/proc/self/statm") as f:
+            import os
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _limit_memory(memory_mb):
+    """
+    Allow memory_mb of address space on top of what the warmed-up worker
+    already uses.
+    """
+    if not memory_mb:
+        return
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows; timeouts still apply
+        return
+    limit = _address_space() + int(memory_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _needs_recycle(baseline, memory_mb):
+    """
+    True when the worker kept more than RECYCLE_FRACTION of its per-worker
+    budget after a job, so the next job would start with less than promised.
+    """
+    if not memory_mb or not baseline:
+        return False
+    return _address_space() - baseline > RECYCLE_FRACTION * memory_mb * 1024 * 1024
+
+
+def _jsonable(value):
+    import json
+    return json.loads(json.dumps(value, default=str))
+
+
+def _worker_main(conn, memory_mb, warm):
+    import ask_ai
+
+    if warm:
+        import data_access
+        data_access.warm_up(engine=True)
+    # Capped after the warm-up so loading data does not count against a job
+    baseline = _address_space()
+    _limit_memory(memory_mb)
+    conn.send(("ready", None))
+    while True:
+        code = conn.recv()
+        if code is None:
+            break
+        try:
+            variables = ask_ai.run_generated_code(code)
+            try:
+                conn.send(("ok", variables, _needs_recycle(baseline, memory_mb)))
+            except Exception:
+                # Unpicklable values go back in their JSON form
+                conn.send(("ok", _jsonable(variables), _needs_recycle(baseline, memory_mb)))
+        except MemoryError:
+            conn.send(("error", MemoryError(f"Generated code exceeded the {memory_mb} MB memory cap."), True))
+        except BaseException as e:
+            conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}"), _needs_recycle(baseline, memory_mb)))
+
+
+class _Worker:
+    def __init__(self, context, memory_mb, warm):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, memory_mb, warm), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    def wait_ready(self, timeout=START_TIMEOUT):
+        if not self.ready:
+            if not self.conn.poll(timeout):
+                raise TimeoutError(f"Sandbox worker did not start within {timeout}s.")
+            try:
+                self.conn.recv()
+            except EOFError:
+                raise RuntimeError(f"Sandbox worker exited during start (exit code {self.process.exitcode}).")
+            self.ready = True
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    def __init__(self, workers=4, timeout=DEFAULT_TIMEOUT, memory_mb=DEFAULT_MEMORY_MB, warm=True):
+        """
+        Parameters:
+            workers: worker processes, i.e. plans executed at once.
+            timeout: default seconds per job.
+            memory_mb: extra address space each worker may use on top of its
+                warmed-up size (None or 0 for no cap); workers are recycled
+                to keep that budget available to every job.
+            warm: load the aggregate index and numeric engine at worker start.
+        """
+        # spawn: forking a process that already holds Chroma's threads is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.warm = warm
+        self._jobs = queue.Queue()
+        self._closed = False
+        self.stats = {"ok": 0, "errors": 0, "timeouts": 0, "cancelled": 0, "restarts": 0}
+        self._stats_lock = threading.Lock()
+        self._threads = []
+        for _ in range(workers):
+            worker = self._spawn()
+            thread = threading.Thread(target=self._serve, args=(worker,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _spawn(self):
+        return _Worker(self._context, self.memory_mb, self.warm)
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _serve(self, worker):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                worker.conn.send(None)
+                worker.process.join(timeout=5)
+                return
+            future, code, timeout = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                worker.wait_ready()
+                worker.conn.send(code)
+            except Exception as e:
+                worker.kill()
+                worker = self._spawn()
+                self._count("restarts")
+                future.set_exception(RuntimeError(f"Sandbox worker failed: {e}"))
+                continue
+
+            deadline = time.monotonic() + timeout
+            outcome = None
+            while outcome is None:
+                if worker.conn.poll(POLL_INTERVAL):
+                    try:
+                        outcome = worker.conn.recv()
+                    except EOFError:
+                        outcome = ("error", RuntimeError("Sandbox worker died while running the plan."), True)
+                elif not worker.process.is_alive():
+                    outcome = ("error", RuntimeError("Sandbox worker died while running the plan."), True)
+                elif getattr(future, "kill_requested", False):
+                    outcome = ("cancelled", None, True)
+                elif time.monotonic() > deadline:
+                    outcome = ("timeout", None, True)
+
+            status, value, recycle = outcome
+            if status == "ok":
+                self._count("ok")
+                future.set_result(value)
+            elif status == "error":
+                self._count("errors")
+                future.set_exception(value)
+            elif status == "timeout":
+                self._count("timeouts")
+                future.set_exception(TimeoutError(f"Generated code exceeded {timeout}s and was stopped."))
+            else:
+                self._count("cancelled")
+                future.set_exception(CancelledError())
+            if not recycle:
+                continue
+            # The worker is mid-computation, dead, or holding too much memory: replace it
+            worker.kill()
+            worker = self._spawn()
+            self._count("restarts")
+
+    def submit(self, code, timeout=None):
+        """
+        Queue a plan; the future resolves to the variables it assigned.
+        """
+        if self._closed:
+            raise RuntimeError("SandboxPool is closed.")
+        future = Future()
+        self._jobs.put((future, code, timeout or self.timeout))
+        return future
+
+    def cancel(self, future):
+        """
+        Cancel a queued job, or stop a running one by killing its worker.
+        """
+        if future.cancel():
+            return True
+        if future.done():
+            return False
+        future.kill_requested = True
+        return True
+
+    def run(self, code, timeout=None):
+        """
+        Execute a plan and return its variables. Raises TimeoutError,
+        MemoryError or RuntimeError (for errors inside the code).
+        """
+        return self.submit(code, timeout).result()
+
+    def close(self):
+        self._closed = True
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=10)
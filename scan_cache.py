@@ -0,0 +1,159 @@
+# Memoised filter scans for dataanalysis.
+#
+# The same hourly scan is repeated constantly: get_nth_highest_value and
+# get_top_n for 2018 temperature read the same records, as do the two passes of
+# detect_outliers. ScanCache keeps the parsed result of each scan (a float64
+# value column and the record ids) keyed on the normalised where filter, in an
+# LRU bounded by bytes, and drops everything when data_version changes, i.e.
+# after an ingest or a new fetch.
+#
+# Scans bigger than max_entry_bytes are streamed through untouched, so the
+# constant-memory behaviour of chroma_scan is kept for very wide queries.
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import chroma_scan
+import data_version
+
+MAX_BYTES = int(os.environ.get("SCAN_CACHE_MB", "256")) * 1024 * 1024
+VERSION_CHECK_INTERVAL = 1.0
+# Rough per-record cost: 8-byte value plus the id string and its list slot
+ID_OVERHEAD = 64
+
+
+def normalise_where(where):
+    """
+    Canonical form of a Chroma where filter: bare values become {"$eq": v},
+    single-clause $and/$or are unwrapped and clause order does not matter.
+    """
+    if not isinstance(where, dict):
+        return where
+    normal = {}
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            clauses = sorted(
+                (normalise_where(clause) for clause in value),
+                key=lambda clause: json.dumps(clause, sort_keys=True),
+            )
+            if len(clauses) == 1:
+                return clauses[0]
+            normal[key] = clauses
+        elif isinstance(value, dict):
+            normal[key] = {op: (sorted(v) if isinstance(v, list) else v) for op, v in value.items()}
+        else:
+            normal[key] = {"$eq": value}
+    return normal
+
+
+def filter_key(collection, where):
+    name = getattr(collection, "name", None) or repr(collection)
+    return f"{name}|{json.dumps(normalise_where(where), sort_keys=True)}"
+
+
+class ScanCache:
+    def __init__(self, max_bytes=MAX_BYTES, max_entry_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 4
+        self._entries = OrderedDict()   # key -> (values, ids, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked = 0.0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "uncached": 0}
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked < VERSION_CHECK_INTERVAL:
+            return
+        self._checked = now
+        version = data_version.current_version()
+        if version != self._version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def peek(self, collection, where):
+        """
+        Cached (values, ids) for a filter, or None. Does not scan.
+        """
+        key = filter_key(collection, where)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0], entry[1]
+
+    def _store(self, key, values, ids):
+        column = np.asarray(values, dtype=np.float64)
+        nbytes = column.nbytes + len(ids) * ID_OVERHEAD
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (column, ids, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, _, dropped) = self._entries.popitem(last=False)
+                self._bytes -= dropped
+                self.stats["evictions"] += 1
+
+    def scan(self, collection, where, value_of):
+        """
+        (value, id) for every matching record, in collection order: from
+        memory when cached, otherwise streamed from Chroma and remembered if
+        the scan is consumed to the end and fits in max_entry_bytes.
+        """
+        cached = self.peek(collection, where)
+        if cached is not None:
+            values, ids = cached
+            yield from zip(values.tolist(), ids)
+            return
+
+        key = filter_key(collection, where)
+        with self._lock:
+            self.stats["misses"] += 1
+        values, ids = [], []
+        limit = self.max_entry_bytes // (8 + ID_OVERHEAD)
+        for value, record_id in chroma_scan.scan_values(collection, where, value_of):
+            if values is not None:
+                if len(values) < limit:
+                    values.append(value)
+                    ids.append(record_id)
+                else:
+                    # Too wide to keep: stream the rest without remembering
+                    values = ids = None
+                    with self._lock:
+                        self.stats["uncached"] += 1
+            yield value, record_id
+        if values is not None:
+            self._store(key, values, ids)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), bytes=self._bytes)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ScanCache()
+    return _cache
@@ -0,0 +1,138 @@
+# Semantic question cache.
+#
+# Past questions are embedded with the same MiniLM model as the weather records
+# and stored, with the code Gemini generated for them, in a separate Chroma
+# collection. A new question whose nearest stored question is similar enough
+# (cosine similarity >= threshold) reuses that code without an LLM call.
+#
+# Embeddings alone cannot tell "max temperature 2018" from "max temperature 2019"
+# or "hottest" from "coldest", so a hit also requires the same numbers,
+# attributes and direction words in both questions.
+
+import hashlib
+import os
+import re
+import threading
+
+import answer_cache
+import data_access
+import data_version
+import embedding_cache
+
+COLLECTION_NAME = "question_cache"
+DEFAULT_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.90"))
+
+ATTRIBUTE_WORDS = {
+    "temperature": ["temperature", "temp", "hot", "hottest", "cold", "coldest", "warm", "warmest", "cool", "coolest", "heat"],
+    "humidity": ["humidity", "humid", "dry", "driest"],
+    "wind_speed": ["wind", "windy", "windiest", "breeze", "gust"],
+}
+DIRECTION_WORDS = {
+    "high": ["max", "maximum", "highest", "hottest", "warmest", "top", "peak", "most", "windiest", "largest"],
+    "low": ["min", "minimum", "lowest", "coldest", "coolest", "bottom", "least", "driest", "smallest"],
+    "mean": ["mean", "average", "avg"],
+    "median": ["median"],
+    "mode": ["mode"],
+    "trend": ["trend", "over the years", "each year", "yearly", "monthly"],
+    "outlier": ["outlier", "outliers", "anomaly", "anomalies", "unusual"],
+}
+MONTH_NAMES = ["january", "february", "march", "april", "may", "june", "july",
+               "august", "september", "october", "november", "december"]
+
+
+def _mentions(text, words):
+    return any(re.search(rf"\b{re.escape(word)}\b", text) for word in words)
+
+
+def question_signature(question):
+    """
+    The parts of a question that must match exactly for cached code to apply.
+    """
+    text = answer_cache.normalise_question(question)
+    numbers = tuple(sorted(re.findall(r"\d+(?:\.\d+)?", text)))
+    months = tuple(m for m in MONTH_NAMES if re.search(rf"\b{m[:3]}(?:{m[3:]})?\b", text))
+    attributes = tuple(a for a, words in ATTRIBUTE_WORDS.items() if _mentions(text, words))
+    directions = tuple(d for d, words in DIRECTION_WORDS.items() if _mentions(text, words))
+    return "|".join(",".join(part) for part in (numbers, months, attributes, directions))
+
+
+class SemanticCache:
+    def __init__(self, collection=None, threshold=DEFAULT_THRESHOLD):
+        if collection is None:
+            collection = data_access.get_collection(COLLECTION_NAME, create=True, metadata={"hnsw:space": "cosine"})
+        self.collection = collection
+        self.threshold = threshold
+        self.embed = embedding_cache.CachedEmbeddingFunction()
+        self._lock = threading.Lock()
+        self._version = None
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _current_version(self):
+        version = data_version.current_version()
+        if version != self._version:
+            # Code generated against older data may reference years that no longer match
+            self.collection.delete(where={"data_version": {"$ne": version}})
+            self._version = version
+        return version
+
+    def lookup(self, question):
+        """
+        Code stored for the most similar past question, or None.
+
+        Returns:
+            (code, similarity, matched question) on a hit, None on a miss.
+        """
+        version = self._current_version()
+        hit = None
+        if self.collection.count():
+            results = self.collection.query(
+                query_embeddings=self.embed([question]),
+                n_results=1,
+                where={"$and": [
+                    {"data_version": {"$eq": version}},
+                    {"signature": {"$eq": question_signature(question)}},
+                ]},
+                include=["metadatas", "distances"],
+            )
+            if results["ids"] and results["ids"][0]:
+                similarity = 1.0 - results["distances"][0][0]
+                meta = results["metadatas"][0][0]
+                if similarity >= self.threshold:
+                    hit = (meta["code"], similarity, meta["question"])
+
+        with self._lock:
+            self.stats["hits" if hit else "misses"] += 1
+        return hit
+
+    def add(self, question, code):
+        version = self._current_version()
+        record_id = hashlib.sha1(answer_cache.normalise_question(question).encode("utf-8")).hexdigest()
+        self.collection.upsert(
+            ids=[record_id],
+            embeddings=self.embed([question]),
+            documents=[question],
+            metadatas=[{
+                "question": question,
+                "code": code,
+                "signature": question_signature(question),
+                "data_version": version,
+            }],
+        )
+
+    def hit_rate(self):
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return self.stats["hits"] / total if total else 0.0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache()
+    return _cache
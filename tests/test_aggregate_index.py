@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import aggregate_index
+import dataanalysis
+import weather_store
+
+
+@pytest.fixture(scope="module")
+def index():
+    """
+    Cube over two synthetic years of hourly temperatures equal to the month number.
+    """
+    times = np.arange(np.datetime64("2019-01-01T00:00"), np.datetime64("2021-01-01T00:00"), np.timedelta64(1, "h"))
+    months = times.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    series = {"time": times.astype("datetime64[s]").astype(np.int64)}
+    for attribute in weather_store.ATTRIBUTES:
+        series[attribute] = months.astype(np.float64)
+    return aggregate_index.AggregateIndex(*aggregate_index.build_cube(series))
+
+
+def test_lookup(index):
+    assert index.lookup("temperature", "max", year=2020) == 12
+    assert index.lookup("temperature", "mean", year=2019, month=3, day=31) == 3
+    assert index.lookup("temperature", "min", month=2, day=29) == 2
+    assert index.lookup("temperature", "max", year=2018) is None
+
+
+@pytest.mark.parametrize("month, day", [(13, None), (-1, None), (99, 1), (5, 32), (5, -3)])
+def test_lookup_out_of_range_periods_have_no_data(index, month, day):
+    assert index.lookup("temperature", "mean", year=2020, month=month, day=day) is None
+
+
+def test_trend_out_of_range_month_is_empty(index):
+    assert index.trend("temperature", "mean", month=7) == {2019: 7.0, 2020: 7.0}
+    assert index.trend("temperature", "mean", month=13) == {}
+
+
+def test_cube_only_serves_the_numeric_backend(monkeypatch, index):
+    monkeypatch.setattr(aggregate_index, "get_index", lambda: index)
+    monkeypatch.setattr(dataanalysis, "BACKEND", "numeric")
+    assert dataanalysis._aggregates() is index
+    assert dataanalysis._aggregates("chroma") is None
+    monkeypatch.setattr(dataanalysis, "BACKEND", "chroma")
+    assert dataanalysis._aggregates() is None
+    assert dataanalysis._aggregates("numeric") is index
+    with pytest.raises(ValueError):
+        dataanalysis._aggregates("sqlite")
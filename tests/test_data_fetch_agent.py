@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import data_fetch_agent
+
+
+def archive_response(start_date, end_date):
+    """
+    Open-Meteo-shaped payload with one reading per hour from start_date to end_date.
+    """
+    hour = datetime.fromisoformat(start_date)
+    end = datetime.fromisoformat(end_date) + timedelta(days=1)
+    times = []
+    while hour < end:
+        times.append(hour.strftime("%Y-%m-%dT%H:%M"))
+        hour += timedelta(hours=1)
+    values = [float(i % 40) for i in range(len(times))]
+    return {"hourly": {"time": times, **{field: list(values) for field in data_fetch_agent.HOURLY_FIELDS}}}
+
+
+@pytest.fixture
+def archive():
+    """
+    Local stub of the archive API. fail_next: statuses to answer before succeeding.
+    """
+    state = {"requests": [], "fail_next": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            state["requests"].append(params)
+            if state["fail_next"]:
+                self.send_response(state["fail_next"].pop(0))
+                self.end_headers()
+                return
+            body = json.dumps(archive_response(params["start_date"], params["end_date"])).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}/v1/archive"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+TODAY = datetime(2024, 3, 10, 12)
+
+
+def fetch(archive, save_dir, **kwargs):
+    return data_fetch_agent.fetch_years_concurrently(
+        2022, 2024, save_dir=str(save_dir), base_url=archive["url"], backoff=0, today=TODAY, **kwargs
+    )
+
+
+def load(save_dir, year):
+    with open(os.path.join(save_dir, f"weather_delhi_{year}.json")) as f:
+        return json.load(f)
+
+
+def test_fresh_fetch_downloads_every_year(archive, tmp_path):
+    status = fetch(archive, tmp_path)
+
+    assert status == {2022: "updated", 2023: "updated", 2024: "updated"}
+    assert load(tmp_path, 2023)["hourly"]["time"][-1] == "2023-12-31T23:00"
+    assert load(tmp_path, 2024)["hourly"]["time"][-1] == "2024-03-10T23:00"
+
+
+def test_complete_closed_years_are_skipped(archive, tmp_path):
+    fetch(archive, tmp_path)
+    archive["requests"].clear()
+
+    status = fetch(archive, tmp_path)
+
+    assert status[2022] == status[2023] == "skipped"
+    assert status[2024] == "updated"
+    assert [r["start_date"] for r in archive["requests"]] == ["2024-03-10"]
+
+
+def test_partial_year_resumes_from_last_filled_day(archive, tmp_path):
+    data = archive_response("2023-01-01", "2023-06-30")
+    # Trailing nulls: the archive had not filled the last hours yet
+    for field in data_fetch_agent.HOURLY_FIELDS:
+        data["hourly"][field][-5:] = [None] * 5
+    with open(tmp_path / "weather_delhi_2023.json", "w") as f:
+        json.dump(data, f)
+
+    status = data_fetch_agent.fetch_years_concurrently(
+        2023, 2023, save_dir=str(tmp_path), base_url=archive["url"], backoff=0, today=TODAY
+    )
+
+    assert status == {2023: "updated"}
+    assert archive["requests"][0]["start_date"] == "2023-06-30"
+    hourly = load(tmp_path, 2023)["hourly"]
+    assert hourly["time"] == archive_response("2023-01-01", "2023-12-31")["hourly"]["time"]
+    assert None not in hourly[data_fetch_agent.HOURLY_FIELDS[0]]
+
+
+def test_transient_errors_are_retried(archive, tmp_path):
+    archive["fail_next"] = [503, 429]
+
+    status = data_fetch_agent.fetch_years_concurrently(
+        2023, 2023, save_dir=str(tmp_path), base_url=archive["url"], backoff=0, today=TODAY
+    )
+
+    assert status == {2023: "updated"}
+    assert len(archive["requests"]) == 3
+
+
+def test_failures_are_reported_per_year(archive, tmp_path):
+    archive["fail_next"] = [404]
+
+    status = data_fetch_agent.fetch_years_concurrently(
+        2023, 2023, save_dir=str(tmp_path), base_url=archive["url"], backoff=0, today=TODAY
+    )
+
+    assert status[2023].startswith("failed:")
+    assert not os.path.exists(tmp_path / "weather_delhi_2023.json")
@@ -0,0 +1,31 @@
+import pytest
+
+import intent_parser
+
+
+@pytest.mark.parametrize("question, code", [
+    ("max temperature in 2018", "result = get_statistic('temperature', 'max', year=2018)"),
+    ("mean humidity March 2019", "result = get_statistic('humidity', 'mean', year=2019, month=3)"),
+    ("5 hottest hours in May 2020", "result = get_top_n(collection, 'temperature', 5, year=2020, month=5)"),
+    ("When was the coldest hour in 2018?", "result = get_nth_lowest_value(collection, 1, 'temperature', year=2018)"),
+])
+def test_simple_questions_take_the_fast_path(question, code):
+    intent = intent_parser.parse_intent(question)
+    assert intent is not None and intent["code"] == code
+
+
+@pytest.mark.parametrize("question", [
+    "max temperature in the morning in 2018",
+    "max temperature in 2018 at 3pm",
+    "max temperature in 2018 at 3 pm",
+    "max temperature in december 2018 at night",
+    "lowest temperature in the last 10 years",
+    "mean humidity since 2019",
+    "max temperature after 2015",
+    "hottest hour in the past 5 years",
+    "mean temperature in summer 2019",
+    "max temperature in 2018 excluding outliers",
+    "max temperature on weekdays in 2018",
+])
+def test_unrecognised_qualifiers_go_to_the_model(question):
+    assert intent_parser.parse_intent(question) is None
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+import plan_executor
+
+CALLS = []
+CALLS_LOCK = threading.Lock()
+
+
+def trend(attribute, statistic="mean", year_range=None):
+    with CALLS_LOCK:
+        CALLS.append(("trend", attribute, statistic, year_range))
+    time.sleep(0.05)
+    start, end = year_range or (2018, 2020)
+    offset = {"temperature": 25, "humidity": 60}.get(attribute, 5)
+    return {year: offset + (year - 2000) / 10 for year in range(start, end + 1)}
+
+
+def statistic(attribute, statistic, year=None):
+    with CALLS_LOCK:
+        CALLS.append(("statistic", attribute, statistic, year))
+    time.sleep(0.05)
+    if attribute == "pressure":
+        raise ValueError("Unknown attribute 'pressure'.")
+    return round(len(attribute) * 1.5 + (year or 0) % 100, 2)
+
+
+FUNCS = {"trend": trend, "statistic": statistic}
+
+PLANS = [
+    'result = statistic("temperature", "max", year=2018)',
+    '''
+temp = trend("temperature")
+hum = trend("humidity")
+diff = {}
+for year in temp:
+    diff[year] = round(temp[year] - hum[year], 2)
+result = diff
+''',
+    '''
+a, b = statistic("temperature", "max", 2018), statistic("humidity", "min", 2019)
+years = (2016, 2019)
+t = trend("temperature", year_range=years)
+t[2016] = 0
+total = a
+total += b
+result = {"a": a, "b": b, "total": total, "t": t}
+''',
+    '''
+first = statistic("temperature", "mean", year=2018)
+first = statistic("humidity", "mean", year=first // 10)
+if first > 10:
+    label = "high"
+else:
+    label = "low"
+result = (first, label)
+''',
+    '''
+x = trend("wind_speed")
+y = trend("wind_speed")
+y[2018] = -1
+result = [x[2018], y[2018]]
+''',
+]
+
+
+def run_exec(code):
+    namespace = {}
+    exec(code, dict(FUNCS), namespace)
+    return namespace
+
+
+def run_parallel(code, registry=None, stats=None):
+    namespace = {}
+    plan_executor.run_plan(code, dict(FUNCS), namespace, set(FUNCS), registry=registry, stats=stats)
+    return namespace
+
+
+@pytest.mark.parametrize("code", PLANS)
+def test_same_namespace_as_exec(code):
+    assert run_parallel(code) == run_exec(code)
+
+
+def test_independent_calls_run_concurrently():
+    code = "\n".join(f'v{i} = statistic("temperature", "mean", year={2015 + i})' for i in range(6))
+    start = time.perf_counter()
+    run_parallel(code)
+    # Six 50 ms calls: sequential would take at least 300 ms
+    assert time.perf_counter() - start < 0.25
+
+
+def test_identical_calls_run_once_and_get_separate_copies():
+    CALLS.clear()
+    stats = {}
+    namespace = run_parallel(PLANS[4], stats=stats)
+
+    assert stats["calls"] == 1 and stats["coalesced"] == 1
+    assert len(CALLS) == 1
+    assert namespace["x"] is not namespace["y"]
+    assert namespace["result"] == [trend("wind_speed")[2018], -1]
+
+
+def test_registry_is_shared_between_plans():
+    CALLS.clear()
+    registry = plan_executor.CallRegistry()
+    code = 'result = trend("temperature")'
+    first = run_parallel(code, registry=registry)
+    second = run_parallel(code, registry=registry)
+
+    assert len(CALLS) == 1
+    assert first == second
+    assert first["result"] is not second["result"]
+
+
+def test_errors_propagate_like_exec():
+    code = 'ok = statistic("temperature", "max")\nbad = statistic("pressure", "max")'
+    with pytest.raises(ValueError, match="pressure"):
+        run_exec(code)
+    with pytest.raises(ValueError, match="pressure"):
+        run_parallel(code)
@@ -0,0 +1,78 @@
+import datetime
+
+import pytest
+
+import prompt_builder
+
+caching = pytest.importorskip("google.generativeai.caching")
+
+
+class FakeContext:
+    def __init__(self, name, expires_in, fail_update=False):
+        self.name = name
+        self.expire_time = datetime.datetime.now(datetime.timezone.utc) + expires_in
+        self.fail_update = fail_update
+        self.updates = 0
+
+    def update(self, ttl):
+        if self.fail_update:
+            raise RuntimeError("404 CachedContent not found")
+        self.updates += 1
+        self.expire_time = datetime.datetime.now(datetime.timezone.utc) + ttl
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """
+    Contexts handed out by a fake CachedContent.create, in creation order; the
+    next one's lifetime and update behaviour are set through `plan`.
+    """
+    state = {"contexts": [], "plan": {"expires_in": prompt_builder.CONTEXT_TTL}}
+
+    def create(model, system_instruction, ttl):
+        context = FakeContext(f"cachedContents/{len(state['contexts'])}", **state["plan"])
+        state["contexts"].append(context)
+        return context
+
+    monkeypatch.setattr(caching.CachedContent, "create", staticmethod(create))
+    monkeypatch.setattr(prompt_builder, "_contexts", {})
+    return state
+
+
+def test_context_is_shared_while_alive(created):
+    first = prompt_builder.cached_context("m", "prompt")
+    assert prompt_builder.cached_context("m", "prompt") is first
+    assert len(created["contexts"]) == 1
+
+
+def test_keep_alive_extends_contexts_near_expiry(created):
+    created["plan"] = {"expires_in": datetime.timedelta(minutes=1)}
+    context = prompt_builder.cached_context("m", "prompt")
+    prompt_builder.keep_alive()
+    assert context.updates == 1
+    assert prompt_builder.cached_context("m", "prompt") is context
+
+
+def test_expired_context_is_recreated(created):
+    created["plan"] = {"expires_in": datetime.timedelta(minutes=-1)}
+    stale = prompt_builder.cached_context("m", "prompt")
+    created["plan"] = {"expires_in": prompt_builder.CONTEXT_TTL}
+    prompt_builder.keep_alive()
+    fresh = prompt_builder.cached_context("m", "prompt")
+    assert fresh is not stale and stale.updates == 0
+    assert len(created["contexts"]) == 2
+
+
+def test_context_that_cannot_be_extended_is_recreated(created):
+    created["plan"] = {"expires_in": datetime.timedelta(minutes=1), "fail_update": True}
+    stale = prompt_builder.cached_context("m", "prompt")
+    created["plan"] = {"expires_in": prompt_builder.CONTEXT_TTL}
+    prompt_builder.keep_alive()
+    assert prompt_builder.cached_context("m", "prompt") is not stale
+
+
+def test_expired_context_is_recreated_without_keep_alive(created):
+    created["plan"] = {"expires_in": datetime.timedelta(minutes=-1)}
+    stale = prompt_builder.cached_context("m", "prompt")
+    created["plan"] = {"expires_in": prompt_builder.CONTEXT_TTL}
+    assert prompt_builder.cached_context("m", "prompt") is not stale
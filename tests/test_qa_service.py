@@ -0,0 +1,121 @@
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+import prompt_builder
+import qa_service
+
+CODE = "```python\nresult = 6 * 7\n```"
+
+
+def reply_for(body):
+    """
+    Generated code for a question, or a summary echoing the computed variables.
+    """
+    text = body["contents"][-1]["parts"][0]["text"]
+    if "Please summarize" in text:
+        return "The answer is " + text.splitlines()[1].split(": ")[1] + "."
+    return CODE
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """
+    Local stub of the Gemini REST API, reached through GEMINI_API_ENDPOINT.
+    Records every request in state["requests"] as (path, body).
+    """
+    state = {"requests": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, payload):
+            body = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            path = self.path.split("?")[0]
+            state["requests"].append((path, body))
+            if path.endswith("/cachedContents"):
+                self._send({"name": "cachedContents/ctx", "model": body["model"],
+                            "expireTime": "2099-01-01T00:00:00Z"})
+                return
+            text = reply_for(body)
+            candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}
+            if path.endswith(":streamGenerateContent"):
+                self._send("[" + json.dumps({"candidates": [candidate]}) + "]")
+            else:
+                self._send({"candidates": [candidate]})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setenv("GEMINI_API_ENDPOINT", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(prompt_builder, "_contexts", {})
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(gemini):
+    service = qa_service.QAService(workers=2, use_cache=False, use_semantic_cache=False,
+                                   use_fast_path=False, warm=False)
+    yield service
+    service.close()
+
+
+def generate_calls(gemini):
+    return [body for path, body in gemini["requests"] if "GenerateContent" in path]
+
+
+def test_ask_generates_runs_and_summarises(gemini, service):
+    answer = service.ask("what is six times seven")
+
+    assert answer["code"] == "result = 6 * 7"
+    assert answer["variables"] == {"result": 42}
+    assert answer["summary"] == "The answer is 42."
+    calls = generate_calls(gemini)
+    assert len(calls) == 2
+    # Both requests run on the shared cached context instead of resending the prompt
+    assert all(body.get("cachedContent") == "cachedContents/ctx" for body in calls)
+
+
+def test_serve_stdin_answers_each_request_and_skips_blank_ones(gemini, service):
+    stdin = io.StringIO("\n".join([
+        "",
+        "   ",
+        json.dumps({"id": 1, "question": "   "}),
+        json.dumps({"id": 2}),
+        json.dumps({"id": 3, "question": "what is six times seven"}),
+        json.dumps({"id": 4, "question": "what is six times seven", "stream": True}),
+        "what is six times seven",
+    ]) + "\n")
+    stdout = io.StringIO()
+
+    qa_service.serve_stdin(service, stdin, stdout)
+
+    lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    by_id = {}
+    for line in lines:
+        by_id.setdefault(line["id"], []).append(line)
+    assert by_id[1] == [{"error": "missing 'question'", "id": 1}]
+    assert by_id[2] == [{"error": "missing 'question'", "id": 2}]
+    assert by_id[3][0]["summary"] == "The answer is 42."
+    assert by_id[4][-1]["event"] == "done"
+    assert by_id[4][-1]["answer"]["summary"] == "The answer is 42."
+    assert by_id[None][0]["summary"] == "The answer is 42."
+    assert len(lines) == 4 + len(by_id[4])
+    # Only the three real questions reached the model (code + summary each)
+    assert len(generate_calls(gemini)) == 6
@@ -0,0 +1,146 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import numeric_engine
+import range_engine
+import weather_store
+
+START = int(np.datetime64("2020-01-01T00:00", "s").astype(np.int64))
+HOURS = 24 * 120
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """
+    RangeEngine over 120 synthetic days: one-decimal values (many ties), some
+    missing hours, and a gap of two whole days.
+    """
+    rng = np.random.default_rng(7)
+    times = START + 3600 * np.arange(HOURS, dtype=np.int64)
+    keep = np.ones(HOURS, dtype=bool)
+    keep[24 * 50:24 * 52] = False
+    series = {"time": times[keep]}
+    for attribute in weather_store.ATTRIBUTES:
+        values = np.round(rng.normal(25, 8, HOURS), 1)
+        values[rng.random(HOURS) < 0.03] = np.nan
+        series[attribute] = values[keep]
+    return range_engine.RangeEngine(numeric_engine.NumericEngine(series=series))
+
+
+def brute(engine, attribute, start, end):
+    numeric = engine.engine
+    values = numeric.values[attribute]
+    mask = (numeric.time >= start) & (numeric.time < end) & ~np.isnan(values)
+    return np.flatnonzero(mask), values[mask]
+
+
+def random_windows(count=400):
+    rng = np.random.default_rng(1)
+    for _ in range(count):
+        start = START + 3600 * int(rng.integers(-48, HOURS + 48))
+        length = int(rng.choice([1, 2, 7, 24, 24 * 7, 24 * 45, HOURS]))
+        yield start, start + 3600 * int(rng.integers(0, length + 1))
+
+
+@pytest.mark.parametrize("statistic", ["count", "mean", "median", "mode", "min", "max"])
+def test_statistics_match_brute_force(engine, statistic):
+    for attribute in weather_store.ATTRIBUTES:
+        index = engine.index(attribute)
+        for start, end in random_windows():
+            _, values = brute(engine, attribute, start, end)
+            got = index.statistic(statistic, *index.bounds(start, end))
+            if not len(values):
+                assert got is None
+            elif statistic == "count":
+                assert got == len(values)
+            elif statistic == "mode":
+                assert got == numeric_engine.compute_statistic(values, "mode")
+            else:
+                assert got == pytest.approx(float(getattr(np, statistic)(values)), abs=1e-9)
+
+
+@pytest.mark.parametrize("largest", [True, False])
+def test_extremes_are_the_earliest_matching_hour(engine, largest):
+    index = engine.index("temperature")
+    for start, end in random_windows():
+        rows, values = brute(engine, "temperature", start, end)
+        position = index.extreme(*index.bounds(start, end), largest=largest)
+        if not len(values):
+            assert position is None
+        else:
+            expected = rows[np.argmax(values) if largest else np.argmin(values)]
+            assert index.rows[position] == expected
+
+
+def test_sparse_table_query_many_matches_single_queries():
+    values = np.round(np.random.default_rng(3).normal(0, 1, 1000), 1)
+    table = range_engine.SparseTable(values, largest=True)
+    lo = np.random.default_rng(4).integers(0, 999, 500)
+    hi = lo + 1 + np.random.default_rng(5).integers(0, 1000 - lo)
+    assert list(table.query_many(lo, hi)) == [table.query(int(a), int(b)) for a, b in zip(lo, hi)]
+
+
+def test_wavelet_matrix_kth_smallest():
+    values = np.round(np.random.default_rng(6).normal(0, 3, 500), 1)
+    matrix = range_engine.WaveletMatrix(values)
+    rng = np.random.default_rng(8)
+    for _ in range(300):
+        lo = int(rng.integers(0, 499))
+        hi = int(rng.integers(lo + 1, 501))
+        k = int(rng.integers(0, hi - lo))
+        assert matrix.kth_smallest(lo, hi, k) == np.sort(values[lo:hi])[k]
+
+
+def test_extreme_window_matches_brute_force(engine):
+    index = engine.index("humidity")
+    start, end = "2020-02-01", "2020-02-29"
+    result = engine.extreme_window("humidity", 24 * 7, start, end, largest=False)
+    lo, hi = index.bounds(range_engine.to_seconds(start), range_engine.to_seconds(end, end=True))
+    times, values = index.times[lo:hi], index.values[lo:hi]
+    means = [
+        values[(times >= t) & (times < t + 7 * 86400)].mean()
+        for t in times if t + 7 * 86400 <= times[-1] + 3600
+    ]
+    assert result["mean"] == pytest.approx(min(means))
+
+
+def test_bounds_are_inclusive_of_end_day_and_hour():
+    assert range_engine.to_seconds("2020-01-02", end=True) == START + 2 * 86400
+    assert range_engine.to_seconds("2020-01-01 05:00", end=True) == START + 5 * 3600 + 1
+    assert range_engine.to_seconds(datetime.date(2020, 1, 1)) == START
+
+
+def test_aware_datetimes_are_read_as_delhi_time():
+    naive = range_engine.to_seconds("2020-01-01 00:00")
+    assert range_engine.to_seconds("2020-01-01 00:00+05:30") == naive
+    assert range_engine.to_seconds("2019-12-31T18:30:00+00:00") == naive
+
+
+def test_days_counts_back_from_the_last_hour(engine):
+    index, lo, hi = engine.window("temperature", days=3)
+    assert index.times[hi - 1] == engine.index("temperature").times[-1]
+    assert index.times[hi - 1] - index.times[lo] < 3 * 86400
+
+
+@pytest.mark.parametrize("hours", [0, -24, 1.5, True])
+def test_window_length_must_be_positive_whole_hours(engine, hours):
+    with pytest.raises(ValueError):
+        engine.extreme_window("temperature", hours)
+
+
+@pytest.mark.parametrize("hours", [0, -24])
+def test_moving_window_length_is_validated(engine, hours):
+    import rolling_analytics
+
+    with pytest.raises(ValueError):
+        rolling_analytics.moving_statistic(engine, "temperature", "mean", hours)
+
+
+@pytest.mark.parametrize("n", [0, -1, 2.5, True])
+def test_number_of_runs_is_validated(engine, n):
+    import rolling_analytics
+
+    with pytest.raises(ValueError):
+        rolling_analytics.threshold_runs(engine, "temperature", 30, n=n)
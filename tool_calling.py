@@ -0,0 +1,219 @@
+# Native function-calling mode for ask_ai.
+#
+# The allowed_funcs table is registered with Gemini as typed tool declarations.
+# The model answers with function calls instead of Python source; each call's
+# arguments are validated against the declaration and the function is invoked
+# directly (collection injected), with independent calls of one model turn run
+# in parallel. No exec() and no markdown-fence stripping.
+
+import inspect
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import prompt_builder
+import weather_store
+
+STATISTICS = ["mean", "median", "mode", "min", "max"]
+
+# Parameter name -> JSON schema shared by every function that takes it
+PARAMETER_SCHEMAS = {
+    "attribute": {"type": "string", "enum": weather_store.ATTRIBUTES, "description": "Weather variable."},
+    "statistic": {"type": "string", "enum": STATISTICS, "description": "Summary statistic."},
+    "year": {"type": "integer", "description": "Calendar year, e.g. 2018. Omit for all years."},
+    "month": {"type": "integer", "description": "Month 1-12. Omit for the whole year."},
+    "day": {"type": "integer", "description": "Day of month 1-31. Requires month."},
+    "n": {"type": "integer", "description": "Rank or count, 1 = first."},
+    "ascending": {"type": "boolean", "description": "True for lowest first, false for highest first."},
+    "year_range": {"type": "array", "items": {"type": "integer"}, "description": "[start_year, end_year], inclusive."},
+    "start": {"type": "string", "description": "Range start, \"YYYY-MM-DD\" or \"YYYY-MM-DD HH:MM\". Omit for the first hour on record."},
+    "end": {"type": "string", "description": "Range end (inclusive), \"YYYY-MM-DD\" or \"YYYY-MM-DD HH:MM\". Omit for the latest hour."},
+    "days": {"type": "integer", "description": "Instead of start: the last N days up to end."},
+    "hours": {"type": "integer", "description": "Window length in hours (24 = a day, 168 = a week)."},
+    "largest": {"type": "boolean", "description": "True for the highest, false for the lowest."},
+    "threshold": {"type": "number", "description": "Value to compare with, e.g. 40 for above 40°C."},
+    "base": {"type": "number", "description": "Base value for degree-hours, e.g. 24 (°C)."},
+    "above": {"type": "boolean", "description": "True for above the threshold/base, false for below."},
+    "daily": {"type": "boolean", "description": "Count consecutive days instead of hours."},
+}
+INTEGER_RANGES = {"month": (1, 12), "day": (1, 31), "n": (1, None), "days": (1, None), "hours": (1, None)}
+
+# Injected by the dispatcher, never exposed to the model
+HIDDEN_PARAMETERS = {"collection", "backend"}
+
+TOOL_SYSTEM_PROMPT = """You answer questions about hourly Delhi weather (2015 to present) in ChromaDB.
+Attributes: temperature (°C), humidity (%), wind_speed (m/s).
+Call the provided functions to get numbers; never guess values.
+Make independent calls in the same turn. When you have the results, answer in one short paragraph."""
+
+
+def _parameters(func):
+    return [
+        p for p in inspect.signature(func).parameters.values()
+        if p.name not in HIDDEN_PARAMETERS
+    ]
+
+
+def function_declaration(name, func):
+    params = _parameters(func)
+    unknown = [p.name for p in params if p.name not in PARAMETER_SCHEMAS]
+    if unknown:
+        raise ValueError(f"No schema for parameter(s) {unknown} of {name}.")
+    return {
+        "name": name,
+        "description": " Returns: ".join(filter(None, prompt_builder.docstring_sections(func))) or name,
+        "parameters": {
+            "type": "object",
+            "properties": {p.name: PARAMETER_SCHEMAS[p.name] for p in params},
+            "required": [p.name for p in params if p.default is inspect.Parameter.empty],
+        },
+    }
+
+
+def build_tools(funcs):
+    """
+    Gemini tools argument for a {name: function} table.
+    """
+    return [{"function_declarations": [function_declaration(name, func) for name, func in funcs.items()]}]
+
+
+def _coerce(name, schema, value):
+    kind = schema["type"]
+    if kind == "integer":
+        # JSON numbers from the model arrive as floats
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or float(value) != int(value):
+            raise ValueError(f"'{name}' must be an integer, got {value!r}.")
+        value = int(value)
+        low, high = INTEGER_RANGES.get(name, (None, None))
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise ValueError(f"'{name}' out of range: {value}.")
+        return value
+    if kind == "number":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"'{name}' must be a number, got {value!r}.")
+        return float(value)
+    if kind == "boolean":
+        if not isinstance(value, bool):
+            raise ValueError(f"'{name}' must be true or false, got {value!r}.")
+        return value
+    if kind == "string":
+        if not isinstance(value, str):
+            raise ValueError(f"'{name}' must be a string, got {value!r}.")
+        if "enum" in schema and value not in schema["enum"]:
+            raise ValueError(f"'{name}' must be one of {schema['enum']}, got {value!r}.")
+        return value
+    if kind == "array":
+        values = list(value)
+        if name == "year_range" and len(values) != 2:
+            raise ValueError(f"'year_range' needs [start_year, end_year], got {value!r}.")
+        return tuple(_coerce(name + "[]", schema["items"], v) for v in values)
+    raise ValueError(f"Unsupported schema type {kind!r}.")
+
+
+class ToolDispatcher:
+    def __init__(self, funcs, collection, max_workers=8):
+        self.funcs = funcs
+        self.collection = collection
+        self.max_workers = max_workers
+        self.declarations = {name: function_declaration(name, func) for name, func in funcs.items()}
+
+    def validate(self, name, args):
+        """
+        Arguments checked and coerced against the declaration; raises ValueError.
+        """
+        if name not in self.declarations:
+            raise ValueError(f"Unknown function '{name}'.")
+        parameters = self.declarations[name]["parameters"]
+        unknown = set(args) - set(parameters["properties"])
+        if unknown:
+            raise ValueError(f"Unknown argument(s) for {name}: {sorted(unknown)}.")
+        missing = [p for p in parameters["required"] if args.get(p) is None]
+        if missing:
+            raise ValueError(f"Missing argument(s) for {name}: {missing}.")
+        return {
+            key: _coerce(key, parameters["properties"][key], value)
+            for key, value in args.items() if value is not None
+        }
+
+    def call(self, name, args):
+        """
+        Validate and invoke one call. Errors are returned, not raised, so the
+        model can see them and correct its call.
+        """
+        try:
+            kwargs = self.validate(name, args)
+            func = self.funcs[name]
+            if "collection" in inspect.signature(func).parameters:
+                kwargs["collection"] = self.collection
+            return {"result": func(**kwargs)}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def call_all(self, calls):
+        """
+        Run [(name, args), ...] concurrently; results come back in call order.
+        """
+        if len(calls) <= 1:
+            return [self.call(name, args) for name, args in calls]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls))) as pool:
+            return list(pool.map(lambda call: self.call(*call), calls))
+
+
+def _plain(value):
+    # proto MapComposite / RepeatedComposite -> dict / list
+    if hasattr(value, "items"):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)) or (hasattr(value, "__iter__") and not isinstance(value, str)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _jsonable(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+def _shown_args(dispatcher, name, args):
+    try:
+        return dispatcher.validate(name, args)
+    except ValueError:
+        return args
+
+
+def function_calls(response):
+    calls = []
+    for part in response.candidates[0].content.parts:
+        if part.function_call.name:
+            calls.append((part.function_call.name, _plain(part.function_call.args)))
+    return calls
+
+
+def answer_with_tools(model, question, dispatcher, max_turns=4):
+    """
+    Let the model call tools until it answers in text.
+
+    Returns:
+        dict with question, calls (name, args, result per call) and summary;
+        "stopped": True when max_turns ran out while the model still wanted tools.
+    """
+    from google.generativeai import protos
+
+    convo = model.start_chat(history=[])
+    response = convo.send_message(question)
+    history = []
+    for _ in range(max_turns):
+        calls = function_calls(response)
+        if not calls:
+            break
+        results = dispatcher.call_all(calls)
+        history.extend(
+            {"name": name, "args": _shown_args(dispatcher, name, args), **result}
+            for (name, args), result in zip(calls, results)
+        )
+        response = convo.send_message([
+            protos.Part(function_response=protos.FunctionResponse(name=name, response=_jsonable(result)))
+            for (name, _), result in zip(calls, results)
+        ])
+    if function_calls(response):
+        # Still calling tools: the response has no text part, so response.text would raise
+        summary = f"Stopped after {max_turns} tool turns without a final answer."
+        return {"question": question, "calls": history, "summary": summary, "stopped": True}
+    return {"question": question, "calls": history, "summary": response.text}
@@ -0,0 +1,158 @@
+# Columnar binary cache of the hourly weather series.
+#
+# Each data/weather_delhi_{year}.json gets sibling .npy files, one per column:
+#   weather_delhi_{year}.time.npy         int64   seconds since epoch (Delhi wall-clock time)
+#   weather_delhi_{year}.temperature.npy  float32 °C
+#   weather_delhi_{year}.humidity.npy     float32 %
+#   weather_delhi_{year}.wind_speed.npy   float32 m/s
+# Missing hours are stored as NaN. Files are memory-mapped on load.
+
+import json
+import os
+import threading
+
+import numpy as np
+
+DATA_DIR = "data"
+ATTRIBUTES = ["temperature", "humidity", "wind_speed"]
+COLUMNS = ["time"] + ATTRIBUTES
+
+# JSON field -> column name
+JSON_FIELDS = {
+    "temperature_2m": "temperature",
+    "relativehumidity_2m": "humidity",
+    "windspeed_10m": "wind_speed",
+}
+
+
+def json_path(year, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"weather_delhi_{year}.json")
+
+
+def column_path(json_file, column):
+    return f"{os.path.splitext(json_file)[0]}.{column}.npy"
+
+
+def _is_fresh(json_file):
+    source_mtime = os.path.getmtime(json_file)
+    for column in COLUMNS:
+        path = column_path(json_file, column)
+        if not os.path.exists(path) or os.path.getmtime(path) < source_mtime:
+            return False
+    return True
+
+
+def convert_file(json_file, force=False):
+    """
+    Convert one weather JSON file into its typed .npy columns.
+    Does nothing if the columns are already newer than the JSON.
+    """
+    if not force and _is_fresh(json_file):
+        return False
+
+    with open(json_file, "r") as f:
+        hourly = json.load(f).get("hourly", {})
+
+    times = hourly.get("time", [])
+    columns = {"time": np.array(times, dtype="datetime64[s]").astype(np.int64)}
+    for field, name in JSON_FIELDS.items():
+        values = [np.nan if v is None else v for v in hourly.get(field, [None] * len(times))]
+        columns[name] = np.array(values, dtype=np.float32)
+
+    for name, values in columns.items():
+        path = column_path(json_file, name)
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, values)
+        os.replace(tmp_path, path)
+    return True
+
+
+def convert_all(data_dir=DATA_DIR, force=False):
+    converted = []
+    for name in sorted(os.listdir(data_dir)):
+        if name.startswith("weather_delhi_") and name.endswith(".json"):
+            if convert_file(os.path.join(data_dir, name), force=force):
+                converted.append(name)
+    return converted
+
+
+def load_file(json_file, mmap=True):
+    """
+    Load the columns belonging to a weather JSON file, converting first if stale.
+
+    Returns:
+        Dict {column: numpy array}; arrays are read-only memory maps when mmap=True.
+    """
+    convert_file(json_file)
+    mode = "r" if mmap else None
+    return {column: np.load(column_path(json_file, column), mmap_mode=mode) for column in COLUMNS}
+
+
+def available_years(data_dir=DATA_DIR):
+    years = []
+    if not os.path.isdir(data_dir):
+        return years
+    for name in os.listdir(data_dir):
+        if name.startswith("weather_delhi_") and name.endswith(".json"):
+            stem = name[len("weather_delhi_"):-len(".json")]
+            if stem.isdigit():
+                years.append(int(stem))
+    return sorted(years)
+
+
+def load_year(year, data_dir=DATA_DIR, mmap=True):
+    return load_file(json_path(year, data_dir), mmap=mmap)
+
+
+_series_cache = {}     # (data_dir, years) -> (fingerprint, concatenated series)
+_series_lock = threading.Lock()
+
+
+def _fingerprint(json_files):
+    return tuple(
+        (path, os.path.getmtime(column_path(path, column)), os.path.getsize(column_path(path, column)))
+        for path in json_files for column in COLUMNS
+    )
+
+
+def load_series(years=None, data_dir=DATA_DIR):
+    """
+    Load the full hourly series for the given years (default: every year on disk).
+    A single year is returned as-is (memory-mapped). Several years are
+    concatenated once per process and the read-only result reused until one
+    of the year files changes.
+    """
+    years = available_years(data_dir) if years is None else list(years)
+    files = [json_path(year, data_dir) for year in years if os.path.exists(json_path(year, data_dir))]
+    if not files:
+        return {
+            "time": np.empty(0, dtype=np.int64),
+            **{attr: np.empty(0, dtype=np.float32) for attr in ATTRIBUTES},
+        }
+    if len(files) == 1:
+        return load_file(files[0])
+
+    for path in files:
+        convert_file(path)
+    key = (os.path.abspath(data_dir), tuple(files))
+    fingerprint = _fingerprint(files)
+    with _series_lock:
+        cached = _series_cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return dict(cached[1])
+        parts = [load_file(path) for path in files]
+        series = {}
+        for column in COLUMNS:
+            series[column] = np.concatenate([part[column] for part in parts])
+            series[column].flags.writeable = False
+        _series_cache[key] = (fingerprint, series)
+        return dict(series)
+
+
+def to_datetime64(times):
+    return np.asarray(times).astype("datetime64[s]")
+
+
+if __name__ == "__main__":
+    converted = convert_all()
+    print(f"✅ Converted {len(converted)} file(s) to columnar .npy.")